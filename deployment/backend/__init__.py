@@ -1 +1,6 @@
-# FastAPI backend package 
\ No newline at end of file
+# FastAPI backend package
+
+from dotenv import load_dotenv
+
+# Load environment variables before any backend module reads its settings at import time
+load_dotenv()
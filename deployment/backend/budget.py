@@ -0,0 +1,204 @@
+"""
+Token budgeting for chat completion requests.
+
+Counts tokens per message (with tiktoken when it is installed, a character
+heuristic otherwise), trims oversized tool results and derives max_tokens
+from whatever context is left, so tool-heavy requests stay bounded.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Context windows for the models we route to; anything unknown uses the default.
+CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = int(os.getenv("OPENAI_CONTEXT_WINDOW", "128000"))
+
+# Hard ceiling on prompt size regardless of the model window - big prompts are slow and expensive.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "24000"))
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "4000"))
+MIN_COMPLETION_TOKENS = int(os.getenv("MIN_COMPLETION_TOKENS", "256"))
+
+# Per-message framing overhead used by the chat format
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "\n\n[... {count} tokens of tool output omitted ...]\n\n"
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # tiktoken downloads its BPE files on first use; fall back when offline
+                logger.warning("tiktoken unavailable, using heuristic token counts: %s", e)
+    return _encoding
+
+
+def load_encoding() -> None:
+    """Load the tokenizer ahead of the first request (it may download its BPE file)."""
+    _get_encoding()
+
+
+def _encode(text: str) -> Optional[list]:
+    """Token ids for text, or None when counting falls back to the heuristic."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return None
+    return encoding.encode(text, disallowed_special=()) if text else []
+
+
+def _heuristic_count(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in a string."""
+    if not text:
+        return 0
+    tokens = _encode(text)
+    return len(tokens) if tokens is not None else _heuristic_count(text)
+
+
+def _content_text(content: Any) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def count_message_tokens(message: Any) -> int:
+    """Count tokens for one chat message, including tool call arguments."""
+    if not isinstance(message, dict):
+        return MESSAGE_OVERHEAD_TOKENS + count_tokens(str(message))
+
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(_content_text(message.get("content")))
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {}) if isinstance(tool_call, dict) else {}
+        tokens += count_tokens(function.get("name", "")) + count_tokens(function.get("arguments", ""))
+    return tokens
+
+
+def count_tools_tokens(tools: Optional[list]) -> int:
+    """Approximate the prompt cost of the tool schemas."""
+    if not tools:
+        return 0
+    return count_tokens(json.dumps(tools, separators=(",", ":"), default=str))
+
+
+def _truncate(text: str, tokens: Optional[list], max_tokens: int) -> tuple[str, int]:
+    """truncate_text() for already encoded text; also returns the resulting token count."""
+    total = len(tokens) if tokens is not None else _heuristic_count(text)
+    if total <= max_tokens:
+        return text, total
+
+    marker = TRUNCATION_MARKER.format(count=total - max_tokens)
+    marker_tokens = count_tokens(marker)
+    keep = max(max_tokens - marker_tokens, 0)
+    head_tokens = keep * 2 // 3
+    tail_tokens = keep - head_tokens
+    if tokens is not None:
+        encoding = _get_encoding()
+        tail = encoding.decode(tokens[-tail_tokens:]) if tail_tokens else ""
+        return encoding.decode(tokens[:head_tokens]) + marker + tail, keep + marker_tokens
+
+    head_chars = head_tokens * CHARS_PER_TOKEN
+    tail_chars = tail_tokens * CHARS_PER_TOKEN
+    return text[:head_chars] + marker + (text[-tail_chars:] if tail_chars else ""), keep + marker_tokens
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of text within max_tokens, marking what was dropped."""
+    return _truncate(text, _encode(text), max_tokens)[0]
+
+
+def context_window(models: list[str]) -> int:
+    """Smallest context window across the models a request may be routed to."""
+    return min(CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW) for model in models)
+
+
+def fit_to_budget(messages: list, tools: Optional[list], models: list[str], max_tokens: int) -> tuple[list, int]:
+    """
+    Shrink a request to fit its token budget.
+
+    Tool results larger than TOOL_RESULT_MAX_TOKENS are truncated first; if the
+    prompt still exceeds the budget, the largest tool results are cut further.
+    Returns the (possibly new) message list and the max_tokens to request.
+
+    Each tool result is encoded once; later cuts reuse those tokens. This is
+    CPU-bound, so async callers should run it in a worker thread.
+    """
+    window = context_window(models)
+    prompt_limit = min(PROMPT_TOKEN_BUDGET, window - MIN_COMPLETION_TOKENS)
+    fixed_tokens = REPLY_PRIMING_TOKENS + count_tools_tokens(tools)
+
+    fitted = []
+    counts = []
+    # Index of each tool result -> its original text and token ids
+    encoded = {}
+    for i, message in enumerate(messages):
+        if isinstance(message, dict) and message.get("role") == "tool":
+            text = _content_text(message.get("content"))
+            tokens = _encode(text)
+            encoded[i] = (text, tokens)
+            content, count = _truncate(text, tokens, TOOL_RESULT_MAX_TOKENS)
+            if content is not text:
+                message = {**message, "content": content}
+            count += MESSAGE_OVERHEAD_TOKENS
+        else:
+            count = count_message_tokens(message)
+        fitted.append(message)
+        counts.append(count)
+
+    prompt_tokens = fixed_tokens + sum(counts)
+    overflow = prompt_tokens - prompt_limit
+    if overflow > 0:
+        tool_indexes = sorted(
+            (i for i, m in enumerate(fitted) if isinstance(m, dict) and m.get("role") == "tool"),
+            key=lambda i: counts[i],
+            reverse=True,
+        )
+        for i in tool_indexes:
+            if overflow <= 0:
+                break
+            text, tokens = encoded[i]
+            keep = max(counts[i] - MESSAGE_OVERHEAD_TOKENS - overflow, 0)
+            content, content_tokens = _truncate(text, tokens, keep)
+            fitted[i] = {**fitted[i], "content": content}
+            new_count = MESSAGE_OVERHEAD_TOKENS + content_tokens
+            overflow -= counts[i] - new_count
+            counts[i] = new_count
+        prompt_tokens = fixed_tokens + sum(counts)
+        if overflow > 0:
+            logger.warning("Prompt still %d tokens over budget after trimming tool results", overflow)
+
+    completion_tokens = max(min(max_tokens, window - prompt_tokens), MIN_COMPLETION_TOKENS)
+    logger.info("Prompt budget: %d prompt tokens, max_tokens=%d", prompt_tokens, completion_tokens)
+    return fitted, completion_tokens
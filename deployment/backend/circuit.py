@@ -0,0 +1,184 @@
+"""
+Circuit breakers for upstream services.
+
+A breaker watches the outcome and latency of recent calls to one upstream. When
+too many of them fail or run slow it opens and calls fail fast with
+CircuitOpenError instead of waiting on timeouts. After a cool-down it lets a
+trial call through (half-open) and closes again once that call succeeds.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"{name} circuit is open - failing fast (retry in {retry_in:.0f}s)")
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker, safe to share between threads."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        window_seconds: float = CIRCUIT_WINDOW_SECONDS,
+        open_seconds: float = CIRCUIT_OPEN_SECONDS,
+        slow_call_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+
+        self._lock = threading.Lock()
+        self._calls: deque = deque()  # (timestamp, failed) pairs inside the window
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go through now. In half-open state only one trial call is allowed."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def record_success(self, latency: float = 0.0) -> None:
+        if self.slow_call_seconds is not None and latency > self.slow_call_seconds:
+            self.record_failure(reason=f"slow call ({latency:.1f}s)")
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info("%s circuit closed", self.name)
+                self._state = CLOSED
+                self._calls.clear()
+            self._trial_in_flight = False
+            self._add_call(False)
+
+    def release(self) -> None:
+        """
+        Give back a call allowed through without recording an outcome.
+
+        For calls that say nothing about the upstream's health (e.g. a request
+        rejected as invalid); in half-open state the next call becomes the trial.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, reason: str = "error") -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN:
+                self._open(f"trial call failed: {reason}")
+                return
+            self._add_call(True)
+            failures = sum(1 for _, failed in self._calls if failed)
+            if (
+                self._state == CLOSED
+                and len(self._calls) >= self.min_calls
+                and failures / len(self._calls) >= self.failure_rate
+            ):
+                self._open(f"{failures}/{len(self._calls)} recent calls failed, last: {reason}")
+
+    def _add_call(self, failed: bool) -> None:
+        now = time.monotonic()
+        self._calls.append((now, failed))
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, why: str) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        logger.warning("%s circuit opened: %s", self.name, why)
+
+    def call(self, fn: Callable[..., Any], *args, is_failure: Callable[[Exception], bool] = None, **kwargs) -> Any:
+        """
+        Run fn through the breaker.
+
+        Raises CircuitOpenError without calling fn when the circuit is open.
+        Exceptions count as failures unless is_failure(exc) returns False, in
+        which case the call is released without an outcome.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.record_failure(reason=str(e)[:200])
+            else:
+                self.release()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            failures = sum(1 for _, failed in self._calls if failed)
+            return {"state": self._state, "recent_calls": len(self._calls), "recent_failures": failures}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **options) -> CircuitBreaker:
+    """Return the process-wide breaker for an upstream, creating it on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **options)
+        return _breakers[name]
+
+
+def all_breakers() -> dict[str, dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,236 @@
+"""
+Resilient wrapper around OpenAI chat completion calls.
+
+Adds timeout-bounded retries with jittered exponential backoff on 429/5xx,
+optional hedged duplicate requests once a call runs past the observed p95
+latency, and a configurable fallback model chain. Each model has its own
+circuit breaker, so a model that keeps failing or running slow is skipped
+straight to the next one instead of waiting on timeouts.
+"""
+
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+import openai
+
+from . import prompt_cache, tracing
+from .circuit import CircuitBreaker, CircuitOpenError, get_breaker
+from .percentiles import percentile
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Model selection
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+FALLBACK_MODELS = [m.strip() for m in os.getenv("OPENAI_FALLBACK_MODELS", "").split(",") if m.strip()]
+MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", "1000"))
+TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+
+# Retry policy
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+TOTAL_TIMEOUT = float(os.getenv("OPENAI_TOTAL_TIMEOUT", "60"))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "8"))
+
+# Hedging
+HEDGE_ENABLED = _env_flag("OPENAI_HEDGE")
+HEDGE_MIN_DELAY = float(os.getenv("OPENAI_HEDGE_MIN_DELAY", "1.0"))
+HEDGE_MIN_SAMPLES = 20
+
+# Circuit breaking: calls slower than this count as failures
+SLOW_CALL_SECONDS = float(os.getenv("OPENAI_SLOW_CALL_SECONDS", "20"))
+
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="openai-hedge")
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies used to pick the hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = list(self._samples)
+        return percentile(samples, pct)
+
+
+latency_tracker = LatencyTracker()
+
+
+def model_breaker(model: str) -> CircuitBreaker:
+    return get_breaker(f"openai:{model}", slow_call_seconds=SLOW_CALL_SECONDS)
+
+
+def model_chain() -> list[str]:
+    """Primary model followed by the configured fallbacks, without duplicates."""
+    chain = []
+    for model in [DEFAULT_MODEL, *FALLBACK_MODELS]:
+        if model not in chain:
+            chain.append(model)
+    return chain
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _should_fall_back(exc: Exception) -> bool:
+    # A model that is unknown or not enabled for this key won't recover on retry,
+    # but the next model in the chain may still serve the request.
+    return _is_retryable(exc) or isinstance(exc, (openai.NotFoundError, openai.PermissionDeniedError))
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff_delay(attempt: int, exc: Exception) -> float:
+    # Full jitter keeps concurrent retries from synchronising into bursts.
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2**attempt)))
+    retry_after = _retry_after(exc)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, RETRY_MAX_DELAY))
+    return delay
+
+
+def _timed_create(client: openai.OpenAI, timeout: float, params: dict[str, Any], hedge: bool = False):
+    """One upstream call; returns the response and its latency."""
+    with tracing.span("openai.request", **{"openai.model": params["model"], "openai.hedge": hedge}) as span:
+        started = time.monotonic()
+        response = client.chat.completions.create(timeout=timeout, extra_headers=tracing.inject_headers(), **params)
+        latency = time.monotonic() - started
+        if response.usage is not None:
+            span.set_attribute("openai.prompt_tokens", response.usage.prompt_tokens)
+            span.set_attribute("openai.cached_tokens", prompt_cache.cached_tokens(response.usage))
+            span.set_attribute("openai.completion_tokens", response.usage.completion_tokens)
+        return response, latency
+
+
+def _hedged_create(client: openai.OpenAI, timeout: float, params: dict[str, Any]):
+    """Send the request, and a duplicate if the first one outlives the p95 delay."""
+    hedge_delay = latency_tracker.percentile(95) or HEDGE_MIN_DELAY
+    if hedge_delay >= timeout:
+        return _timed_create(client, timeout, params)
+
+    # Run in a copy of the caller's context so request-scoped log fields and the active span follow the call
+    primary = _hedge_executor.submit(contextvars.copy_context().run, _timed_create, client, timeout, params)
+    done, _ = wait([primary], timeout=hedge_delay)
+    if done:
+        return primary.result()
+
+    logger.info("Hedging %s request after %.2fs", params["model"], hedge_delay)
+    hedge = _hedge_executor.submit(
+        contextvars.copy_context().run, _timed_create, client, timeout - hedge_delay, params, True
+    )
+    pending = {primary, hedge}
+    last_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            last_error = future.exception()
+    raise last_error
+
+
+def create_chat_completion(client: openai.OpenAI, messages: list, tools: Optional[list] = None, **overrides):
+    """
+    Create a chat completion with retries, optional hedging and model fallback.
+
+    Retryable failures (timeouts, connection errors, 429 and 5xx) are retried with
+    jittered exponential backoff. Once retries for a model are exhausted the next
+    model in the fallback chain is tried. The whole call is bounded by
+    OPENAI_TOTAL_TIMEOUT; the last upstream error is re-raised when it runs out.
+    Models whose circuit is open are skipped, and CircuitOpenError is raised
+    when every model in the chain is open.
+    """
+    deadline = time.monotonic() + TOTAL_TIMEOUT
+    models = [overrides.pop("model")] if "model" in overrides else model_chain()
+    params = {"messages": messages, "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE, **overrides}
+    if tools:
+        params["tools"] = tools
+    create = _hedged_create if HEDGE_ENABLED else _timed_create
+
+    last_error: Optional[Exception] = None
+    for model in models:
+        breaker = model_breaker(model)
+        if not breaker.allow():
+            last_error = last_error or CircuitOpenError(breaker.name, breaker.retry_in())
+            logger.warning("Skipping %s, circuit is open", model)
+            continue
+
+        for attempt in range(MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if attempt == 0:
+                    # The call admitted above never ran; don't keep a half-open trial slot
+                    breaker.release()
+                raise last_error or openai.APITimeoutError(request=None)
+            # The first attempt was admitted above; a retry needs the breaker to still be closed
+            if attempt > 0 and not breaker.allow():
+                break
+            started = time.monotonic()
+            try:
+                response, latency = create(client, min(REQUEST_TIMEOUT, remaining), {**params, "model": model})
+            except openai.OpenAIError as e:
+                last_error = e
+                if _is_retryable(e):
+                    breaker.record_failure(reason=str(e)[:200])
+                else:
+                    # A rejected request says nothing about the upstream's health, so it
+                    # must not close a half-open circuit either
+                    breaker.release()
+                if not _is_retryable(e) or attempt == MAX_RETRIES:
+                    break
+                delay = _backoff_delay(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    break
+                logger.warning("Retrying %s after %.2fs (attempt %d/%d): %s", model, delay, attempt + 1, MAX_RETRIES, e)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success(time.monotonic() - started)
+            # Only the response we return counts; a losing hedged call would skew latency and cache stats
+            latency_tracker.record(latency)
+            if response.usage is not None:
+                prompt_cache.record_usage(response.usage, latency)
+            return response
+
+        if not _should_fall_back(last_error):
+            break
+        logger.warning("Model %s unavailable, falling back: %s", model, last_error)
+
+    raise last_error
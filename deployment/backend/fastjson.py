@@ -0,0 +1,37 @@
+"""
+Fast JSON encoding for API responses.
+
+Uses orjson when it is installed and falls back to a compact stdlib encoding
+otherwise. Routes that declare a response_model are left on FastAPI's own
+serializer, which already encodes pydantic models directly to bytes.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (or compact stdlib JSON)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
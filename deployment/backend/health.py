@@ -0,0 +1,78 @@
+"""
+Deep health checks with cached, periodically refreshed probe results.
+
+A background task in each worker refreshes the probes every
+HEALTH_PROBE_INTERVAL seconds, but only the worker that wins a short lease in
+the shared state actually calls the upstreams. /health/deep just reads the
+stored results, so load balancer polling never turns into upstream traffic.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "30"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+NAMESPACE = "health"
+
+# Probes get their own threads, so a probe stuck on an upstream without a
+# request timeout can't tie up the default executor the request path uses
+_probe_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="health-probe")
+
+
+def probe(check: Callable[[], Any]) -> dict[str, Any]:
+    """Run one upstream check and describe the outcome."""
+    started = time.monotonic()
+    try:
+        check()
+    except Exception as e:
+        return {"status": "down", "latency_ms": round((time.monotonic() - started) * 1000, 1), "error": str(e)[:200]}
+    return {"status": "up", "latency_ms": round((time.monotonic() - started) * 1000, 1)}
+
+
+async def probe_with_timeout(check: Callable[[], Any]) -> dict[str, Any]:
+    """probe() bounded by HEALTH_PROBE_TIMEOUT, even when the check itself has no timeout."""
+    started = time.monotonic()
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(_probe_executor, probe, check), HEALTH_PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+        return {"status": "down", "latency_ms": latency_ms, "error": f"timed out after {HEALTH_PROBE_TIMEOUT:g}s"}
+
+
+async def run_probes(checks: dict[str, Callable[[], Any]]) -> dict[str, Any]:
+    """Run all checks concurrently."""
+    results = await asyncio.gather(*(probe_with_timeout(check) for check in checks.values()))
+    return {"checked_at": time.time(), "upstreams": dict(zip(checks, results))}
+
+
+def cached_results() -> dict[str, Any]:
+    """Latest probe results from any worker, or an empty result before the first run."""
+    return shared_state.get(NAMESPACE, "results") or {"checked_at": None, "upstreams": {}}
+
+
+async def refresh_periodically(checks: dict[str, Callable[[], Any]]) -> None:
+    """Keep the cached probe results fresh; runs until cancelled."""
+    while True:
+        try:
+            # Only one worker per interval wins the lease and probes the upstreams
+            if await asyncio.to_thread(shared_state.add, NAMESPACE, "lease", os.getpid(), ttl=HEALTH_PROBE_INTERVAL):
+                results = await run_probes(checks)
+                await asyncio.to_thread(
+                    shared_state.set, NAMESPACE, "results", results, ttl=HEALTH_PROBE_INTERVAL * 3
+                )
+                down = [name for name, result in results["upstreams"].items() if result["status"] != "up"]
+                if down:
+                    logger.warning("Health probes failing for: %s", ", ".join(down))
+        except Exception as e:
+            logger.error("Health probe refresh failed: %s", e)
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL)
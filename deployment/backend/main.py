@@ -1,22 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 import os
-from dotenv import load_dotenv
 import openai
 from toolhouse import Toolhouse
+from toolhouse.net.http_client import HTTPClient
 import asyncio
+import hashlib
 from typing import Optional
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from .budget import fit_to_budget, load_encoding
+from .circuit import OPEN, CircuitOpenError, all_breakers, get_breaker
+from .completions import MAX_TOKENS, DEFAULT_MODEL, create_chat_completion, model_chain
+from . import fastjson
+from .fastjson import FastJSONResponse
+from . import health
+from . import prompt_cache
+from .log_setup import RequestContextMiddleware, configure_logging
+from .shared_state import shared_state
+from .tool_cache import run_tools_cached
+from . import tracing
+
+# Set up logging (queued, structured, with per-request correlation ids)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the tokenizer now rather than on the first request
+    await asyncio.to_thread(load_encoding)
+    refresher = asyncio.create_task(health.refresh_periodically(health_checks()))
+    yield
+    refresher.cancel()
+    # Don't lose this worker's buffered prompt cache counters
+    await asyncio.to_thread(prompt_cache.flush)
 
-app = FastAPI(title="AI Chat API", version="1.0.0")
+app = FastAPI(title="AI Chat API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS - Allow all origins in production, specific origins in development
 app.add_middleware(
@@ -25,32 +47,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.add_middleware(tracing.TracingMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 # Check for required environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TOOLHOUSE_API_KEY = os.getenv("TOOLHOUSE_API_KEY")
+# Optional override, e.g. to point at a local stub when benchmarking
+TOOLHOUSE_BASE_URL = os.getenv("TOOLHOUSE_BASE_URL")
 
-logger.info(f"OPENAI_API_KEY present: {bool(OPENAI_API_KEY)}")
-logger.info(f"TOOLHOUSE_API_KEY present: {bool(TOOLHOUSE_API_KEY)}")
+logger.info("OPENAI_API_KEY present: %s", bool(OPENAI_API_KEY))
+logger.info("TOOLHOUSE_API_KEY present: %s", bool(TOOLHOUSE_API_KEY))
 
 if not OPENAI_API_KEY:
     logger.warning("OPENAI_API_KEY environment variable not set")
 if not TOOLHOUSE_API_KEY:
     logger.warning("TOOLHOUSE_API_KEY environment variable not set")
 
+# Shared-state tuning (state is shared across workers started by backend.serve)
+TOOL_SCHEMA_TTL = float(os.getenv("TOOL_SCHEMA_TTL", "300"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "0"))  # 0 disables the response cache
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "0"))  # 0 disables rate limiting
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "10"))
+# Proxies whose X-Forwarded-For is trusted (the Next.js server proxies /api/* from localhost)
+TRUSTED_PROXIES = {
+    host.strip() for host in os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if host.strip()
+}
+
+# Batch endpoint limits
+BATCH_DEFAULT_PARALLELISM = int(os.getenv("BATCH_DEFAULT_PARALLELISM", "4"))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "16"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# Toolhouse resilience: the SDK's own retry delay grows as 150**n ms (22.5s before
+# the third retry), so keep its retries short and let the circuit breaker handle
+# sustained outages. Calls slower than TOOLHOUSE_SLOW_CALL_SECONDS count as failures.
+TOOLHOUSE_MAX_RETRIES = int(os.getenv("TOOLHOUSE_MAX_RETRIES", "1"))
+TOOLHOUSE_SLOW_CALL_SECONDS = float(os.getenv("TOOLHOUSE_SLOW_CALL_SECONDS", "15"))
+TOOL_BUNDLE = "jordan-hack"
+
 # Initialize clients with error handling
 openai_client = None
 toolhouse = None
+toolhouse_probe = None
 
 try:
     if OPENAI_API_KEY:
-        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        # Retries are handled by create_chat_completion so they stay within our deadline
+        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
         logger.info("OpenAI client initialized successfully")
     else:
         logger.error("OpenAI client not initialized - missing API key")
 except Exception as e:
-    logger.error(f"Failed to initialize OpenAI client: {e}")
+    logger.error("Failed to initialize OpenAI client: %s", e)
 
 try:
     if TOOLHOUSE_API_KEY:
@@ -58,11 +109,50 @@ try:
             api_key=TOOLHOUSE_API_KEY,
             provider="openai"
         )
+        if TOOLHOUSE_BASE_URL:
+            toolhouse.set_base_url(TOOLHOUSE_BASE_URL)
+        toolhouse.tools._http._max_retries = TOOLHOUSE_MAX_RETRIES
+        # Health probes get their own client so a probe doesn't retry and doesn't
+        # touch toolhouse.bundle; the SDK shares one HTTP client across instances
+        # unless it is replaced
+        toolhouse_probe = Toolhouse(api_key=TOOLHOUSE_API_KEY, provider="openai")
+        if TOOLHOUSE_BASE_URL:
+            toolhouse_probe.set_base_url(TOOLHOUSE_BASE_URL)
+        toolhouse_probe.tools._http = HTTPClient(None)
+        toolhouse_probe.tools._http._max_retries = 0
         logger.info("Toolhouse client initialized successfully")
     else:
         logger.error("Toolhouse client not initialized - missing API key")
 except Exception as e:
-    logger.error(f"Failed to initialize Toolhouse client: {e}")
+    logger.error("Failed to initialize Toolhouse client: %s", e)
+
+toolhouse_breaker = get_breaker("toolhouse", slow_call_seconds=TOOLHOUSE_SLOW_CALL_SECONDS)
+
+def get_tools(bundle: str) -> list:
+    """Tool schemas for a bundle, cached across requests and workers."""
+    # Toolhouse.get_tools records the bundle that run_tools later executes against;
+    # keep it set even when the schemas come from the cache.
+    toolhouse.bundle = bundle
+    return shared_state.get_or_set(
+        "tool_schemas",
+        bundle,
+        # Canonical order keeps the tool schemas byte-identical for provider prompt caching
+        lambda: prompt_cache.canonical_tools(toolhouse_breaker.call(toolhouse.get_tools, bundle=bundle)),
+        ttl=TOOL_SCHEMA_TTL,
+    )
+
+def health_checks() -> dict:
+    """Cheap upstream probes for the configured clients, run by the health refresher."""
+    checks = {}
+    if openai_client:
+        checks["openai"] = lambda: openai_client.models.retrieve(DEFAULT_MODEL, timeout=health.HEALTH_PROBE_TIMEOUT)
+    if toolhouse_probe:
+        # The SDK sets no request timeout; the refresher enforces HEALTH_PROBE_TIMEOUT
+        checks["toolhouse"] = lambda: toolhouse_probe.get_tools(bundle=TOOL_BUNDLE)
+    return checks
+
+def response_cache_key(message: str) -> str:
+    return hashlib.sha256(message.strip().encode("utf-8")).hexdigest()
 
 class ChatRequest(BaseModel):
     message: str
@@ -70,11 +160,24 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
-@app.get("/")
+class BatchChatRequest(BaseModel):
+    requests: list[ChatRequest]
+    parallelism: Optional[int] = None
+
+class BatchChatItem(BaseModel):
+    index: int
+    status_code: int = 200
+    response: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    results: list[BatchChatItem]
+
+@app.get("/", response_class=FastJSONResponse)
 async def root():
     return {"message": "AI Chat API is running"}
 
-@app.get("/health")
+@app.get("/health", response_class=FastJSONResponse)
 async def health_check():
     return {
         "status": "healthy", 
@@ -83,87 +186,247 @@ async def health_check():
         "toolhouse_configured": toolhouse is not None
     }
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    try:
-        logger.info(f"Received chat request: {request.message[:50]}...")
-        
-        if not request.message.strip():
-            raise HTTPException(status_code=400, detail="Message cannot be empty")
-        
-        if not openai_client:
-            logger.error("OpenAI client not configured")
-            raise HTTPException(status_code=503, detail="OpenAI client not configured - missing API key")
-        
-        if not toolhouse:
-            logger.error("Toolhouse client not configured")
-            # For now, let's try without Toolhouse if it's not available
-            logger.info("Proceeding without Toolhouse...")
-            
-            # Simple OpenAI call without tools
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": request.message}],
-                max_tokens=1000,
-                temperature=0.7
+@app.get("/health/deep", response_class=FastJSONResponse)
+async def deep_health_check():
+    """Cached upstream probe results plus this worker's circuit states; never calls upstreams."""
+    results = await asyncio.to_thread(health.cached_results)
+    upstreams = results["upstreams"]
+
+    def is_up(name: str) -> bool:
+        return upstreams.get(name, {}).get("status") == "up"
+
+    if not openai_client or (upstreams and not is_up("openai")):
+        # Chat cannot work at all without OpenAI
+        status = "unhealthy"
+    elif toolhouse and upstreams and not is_up("toolhouse"):
+        # Chat still answers, just without tools
+        status = "degraded"
+    elif not upstreams:
+        status = "starting"
+    else:
+        status = "healthy"
+
+    body = {
+        "status": status,
+        "service": "ai-chat-api",
+        "checked_at": results["checked_at"],
+        "upstreams": upstreams,
+        "circuits": all_breakers(),
+    }
+    return FastJSONResponse(body, status_code=503 if status == "unhealthy" else 200)
+
+@app.get("/api/stats/prompt-cache", response_class=FastJSONResponse)
+async def prompt_cache_stats():
+    """Provider prompt-cache hit rate, cached tokens and latency, aggregated across workers."""
+    return await asyncio.to_thread(prompt_cache.stats)
+
+def client_address(http_request: Request) -> str:
+    """
+    The end user's address for rate limiting.
+
+    Behind a trusted proxy this is the right-most X-Forwarded-For entry that
+    isn't itself a trusted proxy; entries further left are client-supplied.
+    """
+    host = http_request.client.host if http_request.client else "unknown"
+    if host not in TRUSTED_PROXIES:
+        return host
+    forwarded = [entry.strip() for entry in http_request.headers.get("x-forwarded-for", "").split(",")]
+    for entry in reversed(forwarded):
+        if entry and entry not in TRUSTED_PROXIES:
+            return entry
+    return host
+
+async def take_rate_limit_token(client_id: str) -> None:
+    """Charge one chat message to the client's bucket, raising 429 when it is empty."""
+    if RATE_LIMIT_PER_MINUTE > 0:
+        allowed = await asyncio.to_thread(
+            shared_state.take_token, f"chat:{client_id}", RATE_LIMIT_PER_MINUTE / 60.0, RATE_LIMIT_BURST
+        )
+        if not allowed:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded - please slow down")
+
+async def check_rate_limit(http_request: Request) -> None:
+    await take_rate_limit_token(client_address(http_request))
+
+async def generate_reply(message: str) -> str:
+    """Answer one message through the tool pipeline. Errors propagate to the caller."""
+    logger.info("Received chat request: %.50s...", message)
+
+    if not message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    cache_key = response_cache_key(message)
+    if RESPONSE_CACHE_TTL > 0:
+        cached = await asyncio.to_thread(shared_state.get, "responses", cache_key)
+        if cached is not None:
+            logger.info("Serving cached response")
+            tracing.set_attributes(**{"chat.cache_hit": True})
+            return cached
+
+    if not openai_client:
+        logger.error("OpenAI client not configured")
+        raise HTTPException(status_code=503, detail="OpenAI client not configured - missing API key")
+
+    messages = prompt_cache.build_messages(message)
+    final_response = None
+
+    if not toolhouse:
+        logger.error("Toolhouse client not configured")
+        # For now, let's try without Toolhouse if it's not available
+        logger.info("Proceeding without Toolhouse...")
+    elif toolhouse_breaker.state == OPEN:
+        logger.warning("Toolhouse circuit is open - answering without tools")
+        tracing.set_attributes(**{"chat.degraded": "toolhouse circuit open"})
+    else:
+        final_response = await complete_with_tools(messages)
+
+    if final_response is None:
+        # Simple OpenAI call without tools
+        with tracing.span("chat.completion", **{"chat.stage": "no_tools"}):
+            final_response = await asyncio.to_thread(
+                create_chat_completion, openai_client, messages=messages, **prompt_cache.request_options()
             )
-            
-            content = response.choices[0].message.content
-            if not content:
-                content = "I apologize, but I couldn't generate a response. Please try again."
-            
-            logger.info("Response generated successfully (without tools)")
-            return ChatResponse(response=content)
-        
-        # Create messages for OpenAI
-        messages = [
-            {
-                "role": "user",
-                "content": request.message
-            }
-        ]
-        
-        logger.info("Making initial OpenAI request with Toolhouse tools...")
-        
-        # Make initial request to OpenAI with Toolhouse tools from jordan-hack bundle
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+
+    final_content = final_response.choices[0].message.content
+
+    if not final_content:
+        final_content = "I apologize, but I couldn't generate a response. Please try again."
+
+    logger.info("Response generated successfully")
+    if RESPONSE_CACHE_TTL > 0 and final_response.choices[0].message.content:
+        await asyncio.to_thread(shared_state.set, "responses", cache_key, final_content, ttl=RESPONSE_CACHE_TTL)
+    return final_content
+
+async def complete_with_tools(messages: list):
+    """
+    Run the Toolhouse tool loop and return the final completion.
+
+    Returns None when Toolhouse fails or its circuit opens mid-request, so the
+    caller can still answer without tools.
+    """
+    logger.info("Making initial OpenAI request with Toolhouse tools...")
+
+    # Make initial request to OpenAI with Toolhouse tools from jordan-hack bundle
+    try:
+        with tracing.span("toolhouse.get_tools", **{"toolhouse.bundle": TOOL_BUNDLE}):
+            tools = await asyncio.to_thread(get_tools, TOOL_BUNDLE)
+    except Exception as e:
+        logger.warning("Toolhouse tools unavailable, answering without tools: %s", e)
+        tracing.set_attributes(**{"chat.degraded": "toolhouse unavailable"})
+        return None
+    messages, max_tokens = await asyncio.to_thread(fit_to_budget, messages, tools, model_chain(), MAX_TOKENS)
+    with tracing.span("chat.completion", **{"chat.stage": "initial", "chat.tools": len(tools)}):
+        response = await asyncio.to_thread(
+            create_chat_completion,
+            openai_client,
             messages=messages,
-            tools=toolhouse.get_tools(bundle="jordan-hack"),
-            max_tokens=1000,
-            temperature=0.7
+            tools=tools,
+            max_tokens=max_tokens,
+            **prompt_cache.request_options(tools),
         )
-        
-        logger.info("Running Toolhouse tools...")
-        
-        # Run tools if needed and get the final response
-        messages += toolhouse.run_tools(response)
-        
-        logger.info("Making final OpenAI request...")
-        
-        # Make final request to get the response with tool results
-        final_response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+
+    logger.info("Running Toolhouse tools...")
+
+    # Run tools if needed (repeat read-only lookups come from the tool cache)
+    try:
+        with tracing.span("toolhouse.run_tools"):
+            messages += await asyncio.to_thread(toolhouse_breaker.call, run_tools_cached, toolhouse, response)
+    except Exception as e:
+        logger.warning("Toolhouse tool run failed, answering without tools: %s", e)
+        tracing.set_attributes(**{"chat.degraded": "toolhouse tool run failed"})
+        return None
+
+    logger.info("Making final OpenAI request...")
+
+    # Trim oversized tool outputs and size max_tokens to the context that is left
+    messages, max_tokens = await asyncio.to_thread(fit_to_budget, messages, tools, model_chain(), MAX_TOKENS)
+
+    # Make final request to get the response with tool results
+    with tracing.span("chat.completion", **{"chat.stage": "final", "chat.tools": len(tools)}):
+        return await asyncio.to_thread(
+            create_chat_completion,
+            openai_client,
             messages=messages,
-            tools=toolhouse.get_tools(bundle="jordan-hack"),
-            max_tokens=1000,
-            temperature=0.7
+            tools=tools,
+            max_tokens=max_tokens,
+            **prompt_cache.request_options(tools),
         )
-        
-        final_content = final_response.choices[0].message.content
-        
-        if not final_content:
-            final_content = "I apologize, but I couldn't generate a response. Please try again."
-        
-        logger.info("Response generated successfully (with tools)")
-        return ChatResponse(response=final_content)
-        
-    except openai.OpenAIError as e:
-        logger.error(f"OpenAI API error: {e}")
-        raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
+
+def error_detail(e: Exception) -> tuple[int, str]:
+    """Map an exception from generate_reply to an HTTP status code and message."""
+    if isinstance(e, HTTPException):
+        return e.status_code, e.detail
+    if isinstance(e, CircuitOpenError):
+        logger.warning("Failing fast: %s", e)
+        return 503, f"Upstream temporarily unavailable: {str(e)}"
+    if isinstance(e, openai.OpenAIError):
+        logger.error("OpenAI API error: %s", e)
+        return 500, f"OpenAI API error: {str(e)}"
+    logger.error("Unexpected error in chat endpoint: %s", e)
+    return 500, f"Internal server error: {str(e)}"
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    await check_rate_limit(http_request)
+    try:
+        return ChatResponse(response=await generate_reply(request.message))
     except Exception as e:
-        logger.error(f"Unexpected error in chat endpoint: {e}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        status_code, detail = error_detail(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+
+async def run_batch(requests: list[ChatRequest], parallelism: int, client_id: str):
+    """
+    Yield BatchChatItems in completion order, at most `parallelism` running at once.
+
+    Each item costs the client one rate-limit token as it starts, the same as a
+    single chat request; items over the limit fail with 429.
+    """
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def run_item(index: int, item: ChatRequest) -> BatchChatItem:
+        async with semaphore:
+            with tracing.span("chat.batch_item", **{"batch.index": index}) as item_span:
+                try:
+                    await take_rate_limit_token(client_id)
+                    return BatchChatItem(index=index, response=await generate_reply(item.message))
+                except Exception as e:
+                    status_code, detail = error_detail(e)
+                    item_span.status = "error"
+                    item_span.set_attribute("http.status_code", status_code)
+                    return BatchChatItem(index=index, status_code=status_code, error=detail)
+
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(requests)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding work if the client goes away mid-stream
+        for task in tasks:
+            task.cancel()
+
+def batch_parallelism(request: BatchChatRequest) -> int:
+    if len(request.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large - at most {BATCH_MAX_ITEMS} requests")
+    return max(1, min(request.parallelism or BATCH_DEFAULT_PARALLELISM, BATCH_MAX_PARALLELISM))
+
+@app.post("/api/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    parallelism = batch_parallelism(request)
+    logger.info("Received batch of %d requests (parallelism %d)", len(request.requests), parallelism)
+    results = [item async for item in run_batch(request.requests, parallelism, client_address(http_request))]
+    return BatchChatResponse(results=results)
+
+@app.post("/api/chat/batch/stream")
+async def chat_batch_stream(request: BatchChatRequest, http_request: Request):
+    parallelism = batch_parallelism(request)
+    logger.info("Streaming batch of %d requests (parallelism %d)", len(request.requests), parallelism)
+    client_id = client_address(http_request)
+
+    async def lines():
+        async for item in run_batch(request.requests, parallelism, client_id):
+            yield fastjson.dumps(item.model_dump()) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,9 @@
+"""Nearest-rank percentiles, shared by the backend and the benchmark tools."""
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of values (0.0 when there are none)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
@@ -0,0 +1,146 @@
+"""
+Prompt-cache friendly request assembly and cache-hit tracking.
+
+OpenAI reuses the computation for a prompt prefix it has recently seen (1024+
+tokens, matched exactly). Every chat request is therefore laid out with its
+static parts first and byte-identical across requests and conversations: a
+fixed system prompt, then tool schemas sorted by name with canonical key order,
+then the conversation. Requests also carry a prompt_cache_key derived from that
+static prefix so they are routed to the same cache.
+
+The cached_tokens reported in each completion's usage are counted per process
+together with latency for hits and misses, added to the shared state (across
+workers) every PROMPT_CACHE_STATS_FLUSH_SECONDS, and served by
+GET /api/stats/prompt-cache to measure the latency and cost effect.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = (
+    "You are a helpful AI assistant. Use the available tools when they help answer "
+    "the user's question, and answer directly when they don't."
+)
+SYSTEM_PROMPT = os.getenv("SYSTEM_PROMPT", DEFAULT_SYSTEM_PROMPT)
+# Some OpenAI-compatible servers reject unknown parameters
+PROMPT_CACHE_KEY_ENABLED = os.getenv("OPENAI_PROMPT_CACHE_KEY", "true").strip().lower() in ("1", "true", "yes", "on")
+# Price of a cached input token relative to an uncached one
+CACHED_TOKEN_PRICE_RATIO = float(os.getenv("OPENAI_CACHED_TOKEN_PRICE_RATIO", "0.5"))
+# Counters are buffered per process and written to the shared state at most this often
+PROMPT_CACHE_STATS_FLUSH_SECONDS = float(os.getenv("PROMPT_CACHE_STATS_FLUSH_SECONDS", "10"))
+
+STATS_NAMESPACE = "stats"
+STATS_KEY = "prompt_cache"
+
+_pending = defaultdict(int)
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def canonical_tools(tools: Optional[list]) -> list:
+    """Tool schemas sorted by name, with keys in sorted order at every level."""
+    if not tools:
+        return []
+    canonical = [json.loads(json.dumps(tool, sort_keys=True)) for tool in tools]
+    return sorted(canonical, key=lambda tool: tool.get("function", {}).get("name", ""))
+
+
+def build_messages(message: str, history: Optional[list] = None) -> list:
+    """System prompt, then any earlier turns, then the new user message."""
+    return [{"role": "system", "content": SYSTEM_PROMPT}, *(history or []), {"role": "user", "content": message}]
+
+
+def cache_key(tools: Optional[list] = None) -> str:
+    """Stable key for the static prompt prefix (system prompt and tool schemas)."""
+    prefix = json.dumps([SYSTEM_PROMPT, tools or []], sort_keys=True, separators=(",", ":"))
+    return "chat-" + hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+def request_options(tools: Optional[list] = None) -> dict[str, Any]:
+    """Extra create_chat_completion arguments for prompt caching."""
+    if not PROMPT_CACHE_KEY_ENABLED:
+        return {}
+    # Sent as a raw body field: older openai SDKs have no prompt_cache_key argument
+    return {"extra_body": {"prompt_cache_key": cache_key(tools)}}
+
+
+def cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+
+def record_usage(usage, latency: float) -> None:
+    """Count one completion's prompt usage and latency, flushing to the shared stats when due."""
+    global _last_flush
+    if usage is None:
+        return
+    cached = cached_tokens(usage)
+    outcome = "hit" if cached else "miss"
+    with _pending_lock:
+        _pending["requests"] += 1
+        _pending["prompt_tokens"] += usage.prompt_tokens or 0
+        _pending["cached_tokens"] += cached
+        _pending[f"{outcome}_requests"] += 1
+        _pending[f"{outcome}_latency_s"] += latency
+        due = time.monotonic() - _last_flush >= PROMPT_CACHE_STATS_FLUSH_SECONDS
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush()
+
+
+def flush() -> None:
+    """Add this process's buffered counters to the shared stats."""
+    with _pending_lock:
+        amounts = dict(_pending)
+        _pending.clear()
+    if not amounts:
+        return
+    try:
+        shared_state.incr(STATS_NAMESPACE, STATS_KEY, amounts)
+    except Exception as e:
+        # Stats must never fail a chat request; keep the counts for the next flush
+        logger.warning("Could not record prompt cache usage: %s", e)
+        with _pending_lock:
+            for name, amount in amounts.items():
+                _pending[name] += amount
+
+
+def stats() -> dict[str, Any]:
+    # Other workers' latest counts show up after their next flush
+    flush()
+    counters = shared_state.get(STATS_NAMESPACE, STATS_KEY) or {}
+    requests = counters.get("requests", 0)
+    prompt_tokens = counters.get("prompt_tokens", 0)
+    cached = counters.get("cached_tokens", 0)
+    hits = counters.get("hit_requests", 0)
+    misses = counters.get("miss_requests", 0)
+
+    def average_ms(outcome: str, count: int) -> Optional[float]:
+        return round(counters.get(f"{outcome}_latency_s", 0) / count * 1000, 1) if count else None
+
+    return {
+        "requests": requests,
+        "cache_hit_requests": hits,
+        "cache_hit_rate": round(hits / requests, 4) if requests else None,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached,
+        "cached_token_ratio": round(cached / prompt_tokens, 4) if prompt_tokens else None,
+        "avg_latency_ms_hit": average_ms("hit", hits),
+        "avg_latency_ms_miss": average_ms("miss", misses),
+        # Share of prompt token spend avoided thanks to the cache discount
+        "estimated_prompt_cost_saving": (
+            round(cached * (1 - CACHED_TOKEN_PRICE_RATIO) / prompt_tokens, 4) if prompt_tokens else None
+        ),
+        "prompt_cache_key_enabled": PROMPT_CACHE_KEY_ENABLED,
+    }
@@ -0,0 +1,49 @@
+"""
+Production launcher: runs backend.main:app in several uvicorn worker processes.
+
+Workers share caches and rate-limit buckets through backend.shared_state, so
+adding workers scales across cores without multiplying upstream calls.
+
+    python -m backend.serve --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from .log_setup import configure_logging
+from .shared_state import SHARED_STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY if set, otherwise one worker per available core."""
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        cores = os.cpu_count() or 1
+    return max(cores, 1)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the AI Chat API with multiple workers")
+    parser.add_argument("--host", default=os.getenv("BACKEND_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("BACKEND_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args(argv)
+
+    # Pin the shared state location so every worker opens the same database
+    os.environ["SHARED_STATE_PATH"] = SHARED_STATE_PATH
+
+    configure_logging()
+    logger.info("Starting %d workers on %s:%d (shared state: %s)", args.workers, args.host, args.port, SHARED_STATE_PATH)
+    uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
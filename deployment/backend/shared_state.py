@@ -0,0 +1,184 @@
+"""
+Process-shared state backed by a local SQLite database.
+
+Every worker started by backend.serve opens the same database file, so caches
+(tool schemas, responses) and rate-limit buckets are shared across processes
+instead of being duplicated per worker. Values are stored as JSON (via
+backend.fastjson) under a namespace and key, with an optional TTL.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from . import fastjson
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_PATH = os.getenv(
+    "SHARED_STATE_PATH", os.path.join(tempfile.gettempdir(), "ai-chat-shared-state.sqlite3")
+)
+
+# Expired rows are removed lazily; a full sweep runs at most this often per process.
+PURGE_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SharedState:
+    """Key/value store and token buckets shared by all workers on this host."""
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return fastjson.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        self._connect().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, fastjson.dumps(value), expires_at),
+        )
+        self._maybe_purge()
+
+    def add(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set key only if it is absent or expired. Returns True if this call stored it."""
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (namespace, key, now),
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, fastjson.dumps(value), expires_at),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connect().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def trim(self, namespace: str, max_entries: int) -> None:
+        """Evict the entries closest to expiry until at most max_entries remain."""
+        self._connect().execute(
+            """
+            DELETE FROM kv WHERE namespace = ? AND key IN (
+                SELECT key FROM kv WHERE namespace = ?
+                ORDER BY expires_at IS NULL DESC, expires_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (namespace, namespace, max_entries),
+        )
+
+    def get_or_set(self, namespace: str, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value, computing and storing it with factory() on a miss."""
+        value = self.get(namespace, key)
+        if value is None:
+            value = factory()
+            self.set(namespace, key, value, ttl=ttl)
+        return value
+
+    def incr(self, namespace: str, key: str, amounts: dict[str, float]) -> dict[str, float]:
+        """Atomically add to the counters in a stored dict, creating it if absent. Returns the new counters."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+            counters = fastjson.loads(row[0]) if row else {}
+            for name, amount in amounts.items():
+                counters[name] = counters.get(name, 0) + amount
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, NULL)",
+                (namespace, key, fastjson.dumps(counters)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return counters
+
+    def take_token(self, key: str, rate: float, capacity: float) -> bool:
+        """
+        Atomically take one token from a shared bucket.
+
+        The bucket refills at `rate` tokens per second up to `capacity`.
+        Returns False when the bucket is empty.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        conn = self._connect()
+        conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        # Buckets idle for an hour are full again; drop them rather than keep them forever
+        conn.execute("DELETE FROM buckets WHERE updated_at <= ?", (now - 3600,))
+
+
+shared_state = SharedState()
@@ -0,0 +1,107 @@
+"""
+Result cache for idempotent Toolhouse tool calls.
+
+Tools opt in through TOOL_CACHE_TOOLS, a comma-separated list of tool names
+with optional per-tool TTLs in seconds, e.g. "web_search:300,get_weather:900".
+Results are keyed on bundle, Toolhouse metadata (per-user context such as id
+and timezone), tool name and canonicalized arguments and stored in the shared
+state, so a lookup one worker just ran is reused by all of them, but never
+served to a different user.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Optional
+
+from toolhouse.models.RunToolsRequest import RunToolsRequest
+
+from . import tracing
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_DEFAULT_TTL = float(os.getenv("TOOL_CACHE_DEFAULT_TTL", "300"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1000"))
+
+NAMESPACE = "tool_results"
+
+
+def _parse_tool_ttls(spec: str) -> dict[str, float]:
+    ttls = {}
+    for item in spec.split(","):
+        name, _, ttl = item.strip().partition(":")
+        if name:
+            ttls[name] = float(ttl) if ttl else TOOL_CACHE_DEFAULT_TTL
+    return ttls
+
+
+TOOL_CACHE_TTLS = _parse_tool_ttls(os.getenv("TOOL_CACHE_TOOLS", ""))
+
+
+def canonical_arguments(arguments: str) -> str:
+    """Normalize a tool call's JSON arguments so equivalent calls share a key."""
+    try:
+        return json.dumps(json.loads(arguments or "{}"), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        return arguments or ""
+
+
+def cache_key(bundle: str, name: str, arguments: str, metadata: Optional[dict] = None) -> str:
+    context = json.dumps(metadata or {}, sort_keys=True, separators=(",", ":"), default=str)
+    raw = f"{bundle}\x00{context}\x00{name}\x00{canonical_arguments(arguments)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_ttl(name: str) -> Optional[float]:
+    return TOOL_CACHE_TTLS.get(name)
+
+
+def _run_tool(toolhouse, tool_call) -> dict[str, Any]:
+    # Mirrors Toolhouse.run_tools for a single OpenAI tool call
+    if tool_call.function.name in toolhouse.local_tools.get_registered_tools():
+        return toolhouse.local_tools.run_tools(tool_call).model_dump()
+    request = RunToolsRequest(tool_call, toolhouse.provider, toolhouse.metadata, toolhouse.bundle)
+    return toolhouse.tools.run_tools(request).content
+
+
+def run_tools_cached(toolhouse, response) -> list:
+    """
+    Drop-in replacement for toolhouse.run_tools(response) with the OpenAI provider.
+
+    Returns the assistant tool-call message followed by one tool message per
+    call, serving opted-in tools from the cache when a fresh result exists.
+    Each call runs in its own tracing span.
+    """
+    choice = response.choices[0]
+    if choice.finish_reason != "tool_calls":
+        return []
+
+    # exclude_none drops function_call/audio/refusal like the SDK does
+    messages: list = [choice.message.model_dump(exclude_none=True)]
+    for call in choice.message.tool_calls or []:
+        with tracing.span("tool.call", **{"tool.name": call.function.name}) as span:
+            messages.append(_run_tool_cached(toolhouse, call, span))
+
+    return messages
+
+
+def _run_tool_cached(toolhouse, call, span: tracing.Span) -> Any:
+    name = call.function.name
+    ttl = _cache_ttl(name)
+    if not ttl:
+        return _run_tool(toolhouse, call)
+
+    key = cache_key(toolhouse.bundle, name, call.function.arguments, toolhouse.metadata)
+    cached = shared_state.get(NAMESPACE, key)
+    span.set_attribute("tool.cache_hit", cached is not None)
+    if cached is not None:
+        logger.info("Tool cache hit for %s", name)
+        return {**cached, "tool_call_id": call.id}
+
+    result = _run_tool(toolhouse, call)
+    if isinstance(result, dict):
+        shared_state.set(NAMESPACE, key, {k: v for k, v in result.items() if k != "tool_call_id"}, ttl=ttl)
+        shared_state.trim(NAMESPACE, TOOL_CACHE_MAX_ENTRIES)
+    return result
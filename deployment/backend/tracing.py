@@ -0,0 +1,215 @@
+"""
+Lightweight OpenTelemetry-style tracing for the API.
+
+Spans form a tree per request: the HTTP request is the root, with children for
+each pipeline stage (completions, tool runs, individual tool calls and OpenAI
+attempts). The active span lives in a context variable, so it follows the
+request into asyncio.to_thread calls and into executors that run work through
+contextvars.copy_context(). Incoming W3C `traceparent` headers are continued
+and outgoing OpenAI requests carry one, so traces join up with other services.
+
+Finished spans of sampled traces are written as JSON lines to TRACE_EXPORT_PATH
+by a background thread (one span per line, OTLP-like field names), for offline
+analysis with benchmarks/trace_report.py. Tracing is off when the path is unset.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ai-chat-api")
+
+TRACEPARENT_HEADER = "traceparent"
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_span_id", "name", "sampled", "attributes", "status", "start_ns", "end_ns"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], sampled: bool, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.sampled = sampled
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.type"] = type(exc).__name__
+        self.attributes["error.message"] = str(exc)[:500]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "service": TRACE_SERVICE_NAME,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class JSONLSpanExporter:
+    """Appends finished spans to a JSON lines file from a background thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    return
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+_exporter: Optional[JSONLSpanExporter] = JSONLSpanExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None if invalid."""
+    parts = (value or "").strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+@contextlib.contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """
+    Run a block inside a new span, a child of the active span if there is one.
+
+    A root span continues the trace in `traceparent` when it is valid. Exceptions
+    mark the span as failed and propagate.
+    """
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if parent is None else None
+    if parent is not None:
+        new_span = Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+    elif remote is not None:
+        new_span = Span(name, remote[0], remote[1], remote[2], attributes)
+    else:
+        sampled = TRACE_SAMPLE_RATE >= 1.0 or random.random() < TRACE_SAMPLE_RATE
+        new_span = Span(name, secrets.token_hex(16), None, sampled, attributes)
+
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end_ns = time.time_ns()
+        if _exporter is not None and new_span.sampled:
+            _exporter.export(new_span)
+
+
+def set_attributes(**attributes) -> None:
+    """Add attributes to the active span, if any."""
+    active = _current_span.get()
+    if active is not None:
+        active.attributes.update(attributes)
+
+
+def inject_headers() -> dict[str, str]:
+    """Headers that propagate the active span to an outgoing request."""
+    active = _current_span.get()
+    return {TRACEPARENT_HEADER: active.traceparent} if active else {}
+
+
+class TracingMiddleware:
+    """ASGI middleware that wraps each HTTP request in a root span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == TRACEPARENT_HEADER.encode():
+                traceparent = value.decode("latin-1")
+                break
+
+        with span(
+            f"{scope['method']} {scope['path']}",
+            traceparent=traceparent,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as request_span:
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        request_span.status = "error"
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
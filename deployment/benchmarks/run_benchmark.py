@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Load-testing and latency benchmark for the chat backend.
+
+Launches backend.main:app against the local upstream stubs, drives /api/chat at
+fixed concurrency (closed loop) or fixed RPS (open loop) levels and reports
+p50/p95/p99 latency, throughput, error count and peak backend RSS.
+
+Run from the deployment directory:
+
+    python -m benchmarks.run_benchmark --concurrency 1,8,32 --requests 200
+    python -m benchmarks.run_benchmark --rps 20,50 --duration 15
+    python -m benchmarks.run_benchmark --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmark --baseline benchmarks/baseline.json --threshold 10
+
+With --baseline the run exits non-zero if any level's p95 latency or throughput
+regresses by more than --threshold percent.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from backend.percentiles import percentile
+
+DEPLOYMENT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def _launch(app: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=DEPLOYMENT_DIR,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready within {timeout}s")
+
+
+class LevelResult:
+    def __init__(self, label: str):
+        self.label = label
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.elapsed = 0.0
+        self.peak_rss_mb: Optional[float] = None
+
+    def sample_rss(self, pid: int) -> None:
+        rss = _rss_mb(pid)
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss)
+
+    def summary(self) -> dict:
+        completed = len(self.latencies)
+        return {
+            "level": self.label,
+            "requests": completed + self.errors,
+            "errors": self.errors,
+            "throughput_rps": round(completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 1),
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+        }
+
+
+async def _send(client: httpx.AsyncClient, url: str, result: LevelResult) -> None:
+    started = time.perf_counter()
+    try:
+        response = await client.post(url, json={"message": "How fast is this backend?"})
+        if response.status_code == 200:
+            result.latencies.append(time.perf_counter() - started)
+        else:
+            result.errors += 1
+    except httpx.HTTPError:
+        result.errors += 1
+
+
+async def _sample_rss(pid: int, result: LevelResult, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        result.sample_rss(pid)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.25)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_closed_loop(url: str, pid: int, concurrency: int, total: int) -> LevelResult:
+    """Keep `concurrency` requests in flight until `total` have been sent."""
+    result = LevelResult(f"c{concurrency}")
+    remaining = iter(range(total))
+    stop = asyncio.Event()
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for _ in remaining:
+            await _send(client, url, result)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        sampler = asyncio.create_task(_sample_rss(pid, result, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+    return result
+
+
+async def run_open_loop(url: str, pid: int, rps: float, duration: float, max_in_flight: int) -> LevelResult:
+    """Start requests at a fixed rate regardless of how fast earlier ones finish."""
+    result = LevelResult(f"r{rps:g}")
+    stop = asyncio.Event()
+    in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def fire(client: httpx.AsyncClient) -> None:
+        async with in_flight:
+            await _send(client, url, result)
+
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        sampler = asyncio.create_task(_sample_rss(pid, result, stop))
+        started = time.perf_counter()
+        tasks = []
+        for i in range(int(rps * duration)):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(client)))
+        await asyncio.gather(*tasks)
+        result.elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+    return result
+
+
+def compare_to_baseline(results: list[dict], baseline: dict, threshold_pct: float) -> list[str]:
+    """Describe every level whose p95 or throughput regressed beyond the threshold."""
+    previous = {level["level"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in results:
+        before = previous.get(level["level"])
+        if not before:
+            continue
+        if before["p95_ms"] and level["p95_ms"] > before["p95_ms"] * (1 + threshold_pct / 100):
+            regressions.append(f"{level['level']}: p95 {before['p95_ms']}ms -> {level['p95_ms']}ms")
+        if before["throughput_rps"] and level["throughput_rps"] < before["throughput_rps"] * (1 - threshold_pct / 100):
+            regressions.append(
+                f"{level['level']}: throughput {before['throughput_rps']} -> {level['throughput_rps']} rps"
+            )
+    return regressions
+
+
+def _print_table(results: list[dict]) -> None:
+    header = f"{'level':>8} {'reqs':>6} {'errs':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{r['level']:>8} {r['requests']:>6} {r['errors']:>5} {r['throughput_rps']:>8} "
+            f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {rss:>8}"
+        )
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the chat backend against local upstream stubs")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="Closed-loop levels, e.g. 1,8,32")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per closed-loop level")
+    parser.add_argument("--rps", type=_float_list, default=[], help="Open-loop levels in requests/second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per open-loop level")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="In-flight cap for open-loop levels")
+    parser.add_argument("--warmup", type=int, default=10, help="Requests sent before measuring")
+    parser.add_argument("--openai-latency-ms", type=float, default=300)
+    parser.add_argument("--openai-jitter-ms", type=float, default=50)
+    parser.add_argument("--tool-latency-ms", type=float, default=150)
+    parser.add_argument("--tool-call-ratio", type=float, default=1.0, help="Fraction of requests that call tools")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Tool calls per tool-calling response")
+    parser.add_argument("--tool-result-bytes", type=int, default=2000)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub completions that fail")
+    parser.add_argument("--backend-env", action="append", default=[], help="Extra KEY=VALUE for the backend")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--save-baseline", type=Path, help="Write results as the new baseline")
+    parser.add_argument("--baseline", type=Path, help="Compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    stub_port, backend_port = _free_port(), _free_port()
+
+    stub_env = {
+        "STUB_OPENAI_LATENCY_MS": str(args.openai_latency_ms),
+        "STUB_OPENAI_JITTER_MS": str(args.openai_jitter_ms),
+        "STUB_TOOL_LATENCY_MS": str(args.tool_latency_ms),
+        "STUB_TOOL_CALL_RATIO": str(args.tool_call_ratio),
+        "STUB_TOOL_CALLS": str(args.tool_calls),
+        "STUB_TOOL_RESULT_BYTES": str(args.tool_result_bytes),
+        "STUB_ERROR_RATE": str(args.error_rate),
+    }
+    # A private shared-state database, so the stub's tool schemas and the benchmark's
+    # traffic never mix with a dev server's caches and stats on the same host
+    state_dir = tempfile.mkdtemp(prefix="chat-benchmark-")
+    backend_env = {
+        "SHARED_STATE_PATH": os.path.join(state_dir, "shared-state.sqlite3"),
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "TOOLHOUSE_API_KEY": "benchmark",
+        "TOOLHOUSE_BASE_URL": f"http://127.0.0.1:{stub_port}",
+    }
+    for item in args.backend_env:
+        key, _, value = item.partition("=")
+        backend_env[key] = value
+
+    stub = _launch("benchmarks.stub_upstreams:app", stub_port, stub_env)
+    backend = _launch("backend.main:app", backend_port, backend_env)
+    try:
+        _wait_ready(f"http://127.0.0.1:{stub_port}/docs")
+        _wait_ready(f"http://127.0.0.1:{backend_port}/health")
+        url = f"http://127.0.0.1:{backend_port}/api/chat"
+
+        if args.warmup:
+            asyncio.run(run_closed_loop(url, backend.pid, min(args.warmup, 4), args.warmup))
+
+        results = []
+        for concurrency in args.concurrency:
+            level = asyncio.run(run_closed_loop(url, backend.pid, concurrency, args.requests))
+            results.append(level.summary())
+        for rps in args.rps:
+            level = asyncio.run(run_open_loop(url, backend.pid, rps, args.duration, args.max_in_flight))
+            results.append(level.summary())
+    finally:
+        for proc in (backend, stub):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    _print_table(results)
+    report = {"config": {k: v for k, v in vars(args).items() if not isinstance(v, Path)}, "levels": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(report, indent=2))
+            print(f"\nResults written to {path}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            print(f"\nPerformance regressions beyond {args.threshold}%:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Local stand-ins for the OpenAI and Toolhouse APIs used by the benchmark suite.
+
+Both APIs are served from one app so the backend can be pointed at it with
+OPENAI_BASE_URL=http://host:port/v1 and TOOLHOUSE_BASE_URL=http://host:port.
+Latencies and tool-call behaviour are configured through environment variables:
+
+    STUB_OPENAI_LATENCY_MS   mean completion latency (default 300)
+    STUB_OPENAI_JITTER_MS    uniform +/- jitter on completion latency (default 50)
+    STUB_TOOL_LATENCY_MS     latency of each run_tools call (default 150)
+    STUB_TOOL_CALL_RATIO     fraction of tool-enabled requests that call tools (default 1.0)
+    STUB_TOOL_CALLS          tool calls per tool-calling response (default 1)
+    STUB_TOOL_RESULT_BYTES   size of each tool result (default 2000)
+    STUB_ERROR_RATE          fraction of completions answered with a 503 (default 0)
+    STUB_TOOL_ERROR_RATE     fraction of Toolhouse calls answered with a 503 (default 0)
+
+Completions that repeat a prompt_cache_key report part of their prompt as
+cached_tokens, like OpenAI's prompt cache, so cache-hit tracking can be exercised.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+OPENAI_LATENCY_MS = float(os.getenv("STUB_OPENAI_LATENCY_MS", "300"))
+OPENAI_JITTER_MS = float(os.getenv("STUB_OPENAI_JITTER_MS", "50"))
+TOOL_LATENCY_MS = float(os.getenv("STUB_TOOL_LATENCY_MS", "150"))
+TOOL_CALL_RATIO = float(os.getenv("STUB_TOOL_CALL_RATIO", "1.0"))
+TOOL_CALLS = int(os.getenv("STUB_TOOL_CALLS", "1"))
+TOOL_RESULT_BYTES = int(os.getenv("STUB_TOOL_RESULT_BYTES", "2000"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+TOOL_ERROR_RATE = float(os.getenv("STUB_TOOL_ERROR_RATE", "0"))
+
+app = FastAPI(title="Benchmark upstream stubs")
+
+STUB_PROMPT_TOKENS = 50
+STUB_CACHED_TOKENS = 40
+seen_cache_keys: set[str] = set()
+
+STUB_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "web_search",
+            "description": "Search the web for a query",
+            "parameters": {
+                "type": "object",
+                "properties": {"query": {"type": "string"}},
+                "required": ["query"],
+            },
+        },
+    }
+]
+
+
+async def _sleep_ms(mean: float, jitter: float = 0.0) -> None:
+    await asyncio.sleep(max(mean + random.uniform(-jitter, jitter), 0) / 1000)
+
+
+def _completion(model: str, message: dict, finish_reason: str, cached_tokens: int = 0) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": STUB_PROMPT_TOKENS,
+            "completion_tokens": 20,
+            "total_tokens": STUB_PROMPT_TOKENS + 20,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await _sleep_ms(OPENAI_LATENCY_MS, OPENAI_JITTER_MS)
+
+    if random.random() < ERROR_RATE:
+        return JSONResponse(status_code=503, content={"error": {"message": "stub overloaded", "type": "server_error"}})
+
+    messages = body.get("messages", [])
+    model = body.get("model", "stub-model")
+    has_tool_results = any(m.get("role") == "tool" for m in messages)
+    cache_key = body.get("prompt_cache_key")
+    cached_tokens = STUB_CACHED_TOKENS if cache_key in seen_cache_keys else 0
+    if cache_key:
+        seen_cache_keys.add(cache_key)
+
+    if body.get("tools") and not has_tool_results and random.random() < TOOL_CALL_RATIO:
+        tool_calls = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": "web_search", "arguments": json.dumps({"query": f"benchmark {i}"})},
+            }
+            for i in range(TOOL_CALLS)
+        ]
+        message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+        return _completion(model, message, "tool_calls", cached_tokens)
+
+    return _completion(model, {"role": "assistant", "content": "Stub answer."}, "stop", cached_tokens)
+
+
+@app.get("/v1/models/{model}")
+async def retrieve_model(model: str):
+    return {"id": model, "object": "model", "created": 0, "owned_by": "stub"}
+
+
+def _tool_error():
+    return JSONResponse(status_code=503, content={"detail": "stub toolhouse overloaded"})
+
+
+@app.post("/get_tools")
+async def get_tools():
+    if random.random() < TOOL_ERROR_RATE:
+        return _tool_error()
+    return STUB_TOOLS
+
+
+@app.post("/run_tools")
+async def run_tools(request: Request):
+    body = await request.json()
+    tool_call = body.get("content", {})
+    await _sleep_ms(TOOL_LATENCY_MS)
+    if random.random() < TOOL_ERROR_RATE:
+        return _tool_error()
+    return {
+        "provider": "openai",
+        "content": {
+            "role": "tool",
+            "tool_call_id": tool_call.get("id", ""),
+            "name": tool_call.get("function", {}).get("name", ""),
+            "content": "x" * TOOL_RESULT_BYTES,
+        },
+    }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Offline tail-latency report for exported traces.
+
+Reads the JSON lines span file written by backend.tracing (TRACE_EXPORT_PATH)
+or by the Texel SDK's Tracer, prints latency percentiles per span name, and
+breaks down the slowest traces span by span so it is clear which stage (a
+completion, a tool call, a retry) made them slow.
+
+Run from the deployment directory:
+
+    TRACE_EXPORT_PATH=/tmp/spans.jsonl python -m benchmarks.run_benchmark --concurrency 8
+    python -m benchmarks.trace_report /tmp/spans.jsonl --slowest 3
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from backend.percentiles import percentile
+
+
+def load_spans(path: Path) -> list[dict]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                spans.append(json.loads(line))
+    return spans
+
+
+def print_span_table(spans: list[dict]) -> None:
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    for span in spans:
+        durations[span["name"]].append(span["duration_ms"])
+        if span.get("status") == "error":
+            errors[span["name"]] += 1
+
+    header = f"{'span':<40} {'count':>7} {'errors':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, values in sorted(durations.items(), key=lambda item: -percentile(item[1], 99)):
+        print(
+            f"{name[:40]:<40} {len(values):>7} {errors[name]:>7} {percentile(values, 50):>10.1f} "
+            f"{percentile(values, 95):>10.1f} {percentile(values, 99):>10.1f} {max(values):>10.1f}"
+        )
+
+
+def print_trace(spans: list[dict], root: dict) -> None:
+    children = defaultdict(list)
+    for span in spans:
+        children[span.get("parent_span_id")].append(span)
+
+    def walk(span: dict, depth: int) -> None:
+        offset = (span["start_time_unix_nano"] - root["start_time_unix_nano"]) / 1e6
+        flag = " ERROR" if span.get("status") == "error" else ""
+        attributes = ", ".join(f"{k}={v}" for k, v in span.get("attributes", {}).items() if not k.startswith("error."))
+        print(f"  {'  ' * depth}{span['name']:<{40 - 2 * depth}} +{offset:>8.1f}ms {span['duration_ms']:>9.1f}ms{flag}")
+        if attributes:
+            print(f"  {'  ' * depth}  {attributes[:110]}")
+        for child in sorted(children[span["span_id"]], key=lambda s: s["start_time_unix_nano"]):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize exported trace spans")
+    parser.add_argument("path", type=Path, help="JSON lines span file")
+    parser.add_argument("--slowest", type=int, default=3, help="Number of slowest traces to break down")
+    parser.add_argument("--root", help="Only consider root spans with this name, e.g. 'POST /api/chat'")
+    args = parser.parse_args(argv)
+
+    spans = load_spans(args.path)
+    if not spans:
+        print(f"No spans in {args.path}")
+        return 1
+
+    print(f"{len(spans)} spans from {len({s['trace_id'] for s in spans})} traces\n")
+    print_span_table(spans)
+
+    span_ids = {s["span_id"] for s in spans}
+    # Roots are spans whose parent is not in the file (none, or a remote caller)
+    roots = [s for s in spans if s.get("parent_span_id") not in span_ids]
+    if args.root:
+        roots = [s for s in roots if s["name"] == args.root]
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span["trace_id"]].append(span)
+
+    for root in sorted(roots, key=lambda s: -s["duration_ms"])[: args.slowest]:
+        print(f"\nTrace {root['trace_id']} ({root['duration_ms']:.1f}ms)")
+        print_trace(by_trace[root["trace_id"]], root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -44,6 +44,31 @@ def test_backend_import():
         print(f"✗ Backend import failed: {e}")
         return False
 
+def test_breaker_released_when_deadline_expires():
+    """A half-open trial admitted after the deadline has passed must not block the model."""
+    sys.path.append('.')
+    import openai
+    from backend import completions
+
+    breaker = completions.model_breaker("deadline-test-model")
+    breaker.record_failure(reason="test")
+    breaker._open("test")
+    breaker._opened_at -= breaker.open_seconds
+
+    total_timeout = completions.TOTAL_TIMEOUT
+    completions.TOTAL_TIMEOUT = 0
+    try:
+        completions.create_chat_completion(None, [], model="deadline-test-model")
+    except openai.APITimeoutError:
+        pass
+    finally:
+        completions.TOTAL_TIMEOUT = total_timeout
+
+    assert breaker.state == "half_open"
+    assert breaker.allow(), "trial slot was not released"
+    print("✓ Circuit breaker trial released on expired deadline")
+    return True
+
 if __name__ == "__main__":
     print("=== AI Chat App Setup Test ===\n")
     
@@ -51,6 +76,7 @@ if __name__ == "__main__":
     success &= test_imports()
     print()
     success &= test_backend_import()
+    success &= test_breaker_released_when_deadline_expires()
     
     print("\n" + "="*30)
     if success:
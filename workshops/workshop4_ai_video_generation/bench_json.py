@@ -0,0 +1,107 @@
+"""
+JSON Engine Benchmark
+
+Compares the stdlib json module with orjson on Texel-sized payloads: an
+img2img request carrying a base64 init image, and a txt2img response with
+several base64 images. Reports encode/decode time and peak allocations.
+
+Usage:
+    pip install orjson
+    python bench_json.py --image-mb 4 --images 4 --repeat 20
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_request_payload(image_bytes: int) -> dict:
+    """An img2img request body shaped like TexelAPI.generate_image() builds"""
+    return {
+        "model": {"name": "juggernautXL_v8Rundiffusion.safetensors", "type": "SDXL"},
+        "request": {
+            "cfg_scale": 7.0,
+            "denoising_strength": 0.75,
+            "steps": 20,
+            "width": 832,
+            "height": 1216,
+            "negative_prompt": "",
+            "prompt": "A beautiful sunset over mountains",
+            "seed": 12345,
+            "init_images": [base64.b64encode(os.urandom(image_bytes)).decode("utf-8")],
+        },
+        "params": {},
+        "timeout": 120,
+        "callback": {"url": ""},
+    }
+
+
+def make_response_body(image_bytes: int, num_images: int) -> bytes:
+    """A txt2img response body with several base64 images"""
+    images = [base64.b64encode(os.urandom(image_bytes)).decode("utf-8") for _ in range(num_images)]
+    return json.dumps({"id": "job-123", "images": images, "parameters": {}, "info": ""}).encode("utf-8")
+
+
+def measure(fn, repeat: int) -> tuple[float, float]:
+    """Return (mean milliseconds, peak MB allocated) for fn()"""
+    fn()  # warm up
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    mean_ms = (time.perf_counter() - start) / repeat * 1000
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mean_ms, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON engines on Texel payloads")
+    parser.add_argument("--image-mb", type=float, default=4.0, help="Size of each raw image in MB")
+    parser.add_argument("--images", type=int, default=4, help="Images in the response body")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    image_bytes = int(args.image_mb * 1024 * 1024)
+    payload = make_request_payload(image_bytes)
+    body = make_response_body(image_bytes, args.images)
+
+    engines = {
+        # The stdlib path TexelAPI used before: requests' json= encoding and response.json()
+        "json": (lambda: json.dumps(payload).encode("utf-8"), lambda: json.loads(body.decode("utf-8"))),
+    }
+    if orjson is not None:
+        engines["orjson"] = (lambda: orjson.dumps(payload), lambda: orjson.loads(body))
+    else:
+        print("⚠️ orjson is not installed - only the stdlib engine will be measured (pip install orjson)\n")
+
+    print(f"Request payload: {len(json.dumps(payload)) / 1e6:.1f} MB, response body: {len(body) / 1e6:.1f} MB\n")
+    print(f"{'engine':<8} {'encode ms':>10} {'encode MB':>10} {'decode ms':>10} {'decode MB':>10}")
+    print("-" * 52)
+
+    results = {}
+    for name, (encode, decode) in engines.items():
+        encode_ms, encode_mb = measure(encode, args.repeat)
+        decode_ms, decode_mb = measure(decode, args.repeat)
+        results[name] = (encode_ms, decode_ms)
+        print(f"{name:<8} {encode_ms:>10.2f} {encode_mb:>10.1f} {decode_ms:>10.2f} {decode_mb:>10.1f}")
+
+    if "orjson" in results:
+        encode_speedup = results["json"][0] / results["orjson"][0]
+        decode_speedup = results["json"][1] / results["orjson"][1]
+        print(f"\norjson speedup: {encode_speedup:.1f}x encode, {decode_speedup:.1f}x decode")
+
+
+if __name__ == "__main__":
+    main()
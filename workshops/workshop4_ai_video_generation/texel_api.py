@@ -22,6 +22,9 @@ Usage:
 """
 
 import base64
+import functools
+import hashlib
+import json
 import random
 import time
 from pathlib import Path
@@ -29,16 +32,111 @@ from typing import Any
 
 import requests
 
+# Instrumentation, circuit breaking and tracing live in their own modules; they
+# are imported here so `from texel_api import StatsCollector` etc. keep working
+from texel_circuit import CircuitBreaker
+from texel_instrumentation import StatsCollector, TexelHooks
+from texel_tracing import Tracer
+
+try:
+    # Optional: orjson encodes/decodes the multi-megabyte base64 payloads much faster
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(data: Any) -> bytes:
+    """Encode a request body as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    """Decode a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Video model configurations. "modes" lists what each model supports: "t2v" is text
+# to video, "i2v" is image to video. width/height/frames are used when the caller
+# doesn't pass them (framepack renders a fixed length instead of a frame count).
+VIDEO_MODELS = {
+    "framepack": {
+        "name": "FramePackI2V_HY_fp8_e4m3fn",
+        "type": "FRAMEPACK_VIDEO",
+        "modes": ("i2v",),
+        "width": 640,
+        "height": 480,
+        "frames": None,
+    },
+    "ltxv": {
+        "name": "ltxv-13b-0.9.7-dev-fp8",
+        "type": "LTX_VIDEO",
+        "modes": ("t2v", "i2v"),
+        "width": 360,
+        "height": 640,
+        "frames": 97,
+    },
+    "wan": {
+        "name": "wan2.1_t2v_14B_fp8_scaled",
+        "type": "WAN_VIDEO",
+        "modes": ("t2v", "i2v"),
+        "width": 640,
+        "height": 480,
+        "frames": 81,
+    },
+    "hunyuan": {
+        "name": "hunyuan_video_t2v_720p_bf16",
+        "type": "HUNYUAN_VIDEO",
+        "modes": ("t2v",),
+        "width": 640,
+        "height": 480,
+        "frames": 81,
+    },
+}
+
+
+def video_settings(model: str, width: int = None, height: int = None, frames: int = None) -> tuple:
+    """Resolve (width, height, frames) for a video model, filling in its defaults"""
+    config = VIDEO_MODELS[model]
+    return (
+        width if width is not None else config["width"],
+        height if height is not None else config["height"],
+        frames if frames is not None else config["frames"],
+    )
+
 
 class TexelAPIError(Exception):
     """Custom exception for Texel API errors"""
 
-    def __init__(self, message: str, status_code: None):
+    def __init__(self, message: str, status_code: int = None):
         self.message = message
         self.status_code = status_code
         super().__init__(self.message)
 
 
+class TexelCircuitOpenError(TexelAPIError):
+    """Raised without contacting the API while the client's circuit breaker is open"""
+
+
+def _traced(name: str):
+    """Run a TexelAPI method inside a span when the client has a tracer"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.tracer is None:
+                return method(self, *args, **kwargs)
+            with self.tracer.span(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 class TexelAPI:
     """
     Texel AI API Client
@@ -46,16 +144,30 @@ class TexelAPI:
     A simple Python client for generating images and videos using the Texel AI API.
     """
 
-    def __init__(self, api_key: str, base_url: str = "https://api.prod.texel.ai/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.prod.texel.ai/v1",
+        hooks: list = None,
+        circuit_breaker: CircuitBreaker = None,
+        tracer: Tracer = None,
+    ):
         """
         Initialize the Texel API client
 
         Args:
             api_key: Your Texel API key (get one from https://texel.ai)
             base_url: The base URL for the Texel API (default: https://api.prod.texel.ai/v1)
+            hooks: Optional list of TexelHooks instances to receive instrumentation events
+            circuit_breaker: Optional CircuitBreaker that makes requests fail fast while the API is failing
+            tracer: Optional Tracer that records a span for every call
         """
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
+        self.hooks = list(hooks or [])
+        self.circuit_breaker = circuit_breaker
+        self.tracer = tracer
+        self._job_states = {}
         self.session = requests.Session()
         self.session.headers.update(
             {
@@ -65,6 +177,29 @@ class TexelAPI:
             }
         )
 
+    def add_hook(self, hook: TexelHooks) -> None:
+        """Register an instrumentation hook"""
+        self.hooks.append(hook)
+
+    def _emit(self, event: str, **fields) -> None:
+        for hook in self.hooks:
+            try:
+                getattr(hook, event)(**fields)
+            except Exception:
+                pass
+
+    def _annotate(self, **attributes) -> None:
+        """Add attributes to the active span when tracing"""
+        if self.tracer is not None:
+            self.tracer.set_attributes(**attributes)
+
+    @staticmethod
+    def _endpoint_label(endpoint: str) -> str:
+        # Group status checks for every job under one label
+        if endpoint.startswith("/sd_server/status/"):
+            return "/sd_server/status"
+        return endpoint
+
     def _image_to_base64(self, image_path: Path) -> str:
         """Convert an image file to base64 string"""
         try:
@@ -74,31 +209,73 @@ class TexelAPI:
         except Exception as e:
             raise TexelAPIError(f"Error reading image file {image_path}: {e}")
 
+    @_traced("texel.request")
     def _make_request(self, endpoint: str, payload: dict[str, Any] = None, method: str = "POST") -> dict[str, Any]:
         """Make a request to the Texel API"""
         url = f"{self.base_url}{endpoint}"
+        method = method.upper()
+        body = _json_dumps(payload) if method != "GET" else b""
+        label = self._endpoint_label(endpoint)
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow():
+            raise TexelCircuitOpenError(
+                f"Texel API circuit is open - failing fast (retry in {breaker.retry_in():.0f}s)"
+            )
+        if self.hooks:
+            self._emit("on_request_start", method=method, endpoint=label, bytes_sent=len(body))
+        # Propagate the active span so server-side traces can join this one
+        headers = {"traceparent": Tracer.traceparent()} if self.tracer is not None else None
+        started = time.perf_counter()
+        response = None
+        error = None
 
         try:
-            if method.upper() == "GET":
-                response = self.session.get(url)
+            if method == "GET":
+                response = self.session.get(url, headers=headers)
             else:
                 # For debugging requests
                 # with open('request.json', 'w') as f:
                 #     json.dump(payload, f)
-                response = self.session.post(url, json=payload)
+                response = self.session.post(url, data=body, headers=headers)
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
         except requests.exceptions.RequestException as e:
+            error = str(e)
             if hasattr(e, "response") and e.response is not None:
                 try:
-                    error_data = e.response.json()
+                    error_data = _json_loads(e.response.content)
                     error_message = error_data.get("error", str(e))
                 except:
                     error_message = str(e)
                 raise TexelAPIError(error_message, e.response.status_code)
             else:
                 raise TexelAPIError(str(e))
-
+        except ValueError as e:
+            error = str(e)
+            raise TexelAPIError(f"Invalid JSON response from {endpoint}: {e}", response.status_code)
+        finally:
+            elapsed = time.perf_counter() - started
+            status_code = response.status_code if response is not None else None
+            if breaker is not None:
+                if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+                    # A rejected request says nothing about the API's health, so it can't close the circuit
+                    breaker.release()
+                else:
+                    breaker.record(status_code is None or status_code == 429 or status_code >= 500, elapsed)
+            self._annotate(**{"http.method": method, "http.target": label, "http.status_code": status_code})
+            if self.hooks:
+                self._emit(
+                    "on_request_end",
+                    method=method,
+                    endpoint=label,
+                    status_code=status_code,
+                    elapsed=elapsed,
+                    bytes_sent=len(body),
+                    bytes_received=len(response.content) if response is not None else 0,
+                    error=error,
+                )
+
+    @_traced("texel.generate_image")
     def generate_image(
         self,
         prompt: str,
@@ -137,6 +314,7 @@ class TexelAPI:
         }
 
         model_name = model_mapping.get(model, model)
+        self._annotate(model=model, width=width, height=height, num_images=num_images, img2img=bool(init_image_path))
 
         # Process init image if provided
         init_image_base64 = None
@@ -195,14 +373,15 @@ class TexelAPI:
             "seed": seed,
         }
 
+    @_traced("texel.generate_video")
     def generate_video(
         self,
         prompt: str,
         model: str = "framepack",
         negative_prompt: str = "",
-        width: int = 640,
-        height: int = 480,
-        frames: int = 81,
+        width: int = None,
+        height: int = None,
+        frames: int = None,
         steps: int = 30,
         cfg_scale: float = 3.0,
         seed: int = None,
@@ -215,9 +394,9 @@ class TexelAPI:
             prompt: Text description of the video to generate
             model: Video model to use (framepack, ltxv, wan, hunyuan)
             negative_prompt: What to avoid in the generation
-            width: Video width in pixels
-            height: Video height in pixels
-            frames: Number of frames to generate
+            width: Video width in pixels (default depends on the model, see VIDEO_MODELS)
+            height: Video height in pixels (default depends on the model)
+            frames: Number of frames to generate (default depends on the model; ignored by framepack)
             steps: Number of inference steps
             cfg_scale: How closely to follow the prompt
             seed: Random seed for reproducible results
@@ -226,19 +405,11 @@ class TexelAPI:
         Returns:
             Dictionary containing job information for async video generation
         """
-        # Video model configurations
-        # I2V means image to video only, T2V means text to video only, LTXV can do both.
-        video_models = {
-            "framepack": {"name": "FramePackI2V_HY_fp8_e4m3fn", "type": "FRAMEPACK_VIDEO"},
-            "ltxv": {"name": "ltxv-13b-0.9.7-dev-fp8", "type": "LTX_VIDEO"},
-            "wan": {"name": "wan2.1_t2v_14B_fp8_scaled", "type": "WAN_VIDEO"},
-            "hunyuan": {"name": "hunyuan_video_t2v_720p_bf16", "type": "HUNYUAN_VIDEO"},
-        }
+        if model not in VIDEO_MODELS:
+            raise TexelAPIError(f"Unknown video model: {model}. Available models: {list(VIDEO_MODELS.keys())}")
 
-        if model not in video_models:
-            raise TexelAPIError(f"Unknown video model: {model}. Available models: {list(video_models.keys())}")
-
-        model_config = video_models[model]
+        model_config = VIDEO_MODELS[model]
+        width, height, frames = video_settings(model, width, height, frames)
 
         # Process init image if provided
         init_image_base64 = None
@@ -272,9 +443,9 @@ class TexelAPI:
             payload = {
                 "model": {"name": model_config["name"], "type": model_config["type"]},
                 "request": {
-                    "width": 360,
-                    "height": 640,
-                    "frames": 97,
+                    "width": width,
+                    "height": height,
+                    "frames": frames,
                     "seed": seed,
                     "profile": "13b Dynamic",
                     "prompt": prompt,
@@ -330,6 +501,15 @@ class TexelAPI:
         endpoint = "/sd_server/img2vid" if init_image_base64 else "/sd_server/txt2vid"
 
         result = self._make_request(endpoint, payload)
+        self._track_job_state(result.get("id"), model_config["type"], "submitted")
+        self._annotate(
+            model=model,
+            job_id=result.get("id"),
+            img2vid=bool(init_image_base64),
+            width=width,
+            height=height,
+            frames=frames,
+        )
 
         return {
             "success": True,
@@ -338,6 +518,9 @@ class TexelAPI:
             "model_type": model_config["type"],
             "prompt": prompt,
             "seed": seed,
+            "width": width,
+            "height": height,
+            "frames": frames,
             "status": "processing",
         }
 
@@ -358,6 +541,7 @@ class TexelAPI:
         """
         return self.generate_video(prompt=prompt, model=model, init_image_path=image_path, **kwargs)
 
+    @_traced("texel.check_video_status")
     def check_video_status(self, job_id: str, model_type: str) -> dict[str, Any]:
         """
         Check the status of a video generation job
@@ -379,6 +563,11 @@ class TexelAPI:
             progress = result.get("progress", 0)
             error_message = result.get("error_message", "")
 
+            self._annotate(job_id=job_id, job_status=job_status, progress=progress)
+            if self.hooks:
+                self._emit("on_poll", job_id=job_id, status=job_status, progress=progress)
+                self._track_job_state(job_id, model_type, job_status)
+
             return {
                 "job_id": job_id,
                 "status": job_status,
@@ -399,6 +588,18 @@ class TexelAPI:
                 "failed": True,
             }
 
+    def _track_job_state(self, job_id: str, model_type: str, status: str) -> None:
+        """Emit on_job_state when a job's status differs from the last one seen"""
+        if not self.hooks or not job_id:
+            return
+        previous = self._job_states.get(job_id)
+        if status != previous:
+            self._job_states[job_id] = status
+            self._emit("on_job_state", job_id=job_id, model_type=model_type, old_status=previous, new_status=status)
+        if status in ("success", "failed", "error"):
+            self._job_states.pop(job_id, None)
+
+    @_traced("texel.wait_for_video")
     def wait_for_video(
         self, job_id: str, model_type: str, timeout: int = 300, poll_interval: int = 5
     ) -> dict[str, Any]:
@@ -415,15 +616,19 @@ class TexelAPI:
             Dictionary containing final job status and results
         """
         start_time = time.time()
+        polls = 0
 
         while time.time() - start_time < timeout:
             status = self.check_video_status(job_id, model_type)
+            polls += 1
 
             if status["completed"] or status["failed"]:
+                self._annotate(job_id=job_id, job_status=status["status"], polls=polls)
                 return status
 
             time.sleep(poll_interval)
 
+        self._annotate(job_id=job_id, job_status="timeout", polls=polls)
         return {
             "job_id": job_id,
             "status": "timeout",
@@ -434,14 +639,21 @@ class TexelAPI:
             "failed": True,
         }
 
-    def download_video(self, video_url: str, save_path: str) -> None:
+    @_traced("texel.download_video")
+    def download_video(self, video_url: str, save_path: str) -> dict[str, Any]:
         """
         Download a video from a signed URL
 
         Args:
             video_url: The signed URL from video generation results
             save_path: Where to save the downloaded video
+
+        Returns:
+            Dictionary with the saved path, its size in bytes and its SHA-256 (hashed while streaming)
         """
+        started = time.perf_counter()
+        received = 0
+        digest = hashlib.sha256()
         try:
             response = requests.get(video_url, stream=True)
             response.raise_for_status()
@@ -449,18 +661,33 @@ class TexelAPI:
             with open(save_path, "wb") as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
 
         except Exception as e:
+            if self.hooks:
+                elapsed = time.perf_counter() - started
+                self._emit("on_download", kind="video", bytes_received=received, elapsed=elapsed, error=str(e))
             raise TexelAPIError(f"Error downloading video: {e}")
 
-    def download_image(self, image_base64: str, save_path: str) -> None:
+        self._annotate(bytes_received=received)
+        if self.hooks:
+            self._emit("on_download", kind="video", bytes_received=received, elapsed=time.perf_counter() - started)
+        return {"path": save_path, "bytes": received, "sha256": digest.hexdigest()}
+
+    @_traced("texel.download_image")
+    def download_image(self, image_base64: str, save_path: str) -> dict[str, Any]:
         """
         Save a base64 encoded image to a file
 
         Args:
             image_base64: Base64 encoded image data
             save_path: Where to save the image
+
+        Returns:
+            Dictionary with the saved path, its size in bytes and its SHA-256
         """
+        started = time.perf_counter()
         try:
             image_data = base64.b64decode(image_base64)
             with open(save_path, "wb") as f:
@@ -468,6 +695,11 @@ class TexelAPI:
         except Exception as e:
             raise TexelAPIError(f"Error saving image: {e}")
 
+        if self.hooks:
+            elapsed = time.perf_counter() - started
+            self._emit("on_download", kind="image", bytes_received=len(image_data), elapsed=elapsed)
+        return {"path": save_path, "bytes": len(image_data), "sha256": hashlib.sha256(image_data).hexdigest()}
+
 
 # Convenience functions for quick usage
 def generate_image(api_key: str, prompt: str, **kwargs) -> dict[str, Any]:
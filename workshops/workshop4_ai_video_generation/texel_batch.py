@@ -0,0 +1,400 @@
+"""
+Texel AI Batch Runner
+
+Generates images and videos in bulk from a JSONL or CSV manifest.
+
+Each manifest row is one job. Rows are run concurrently, outputs are written to
+an output directory, and every finished row is appended to a results ledger.
+Rerunning the same command skips rows the ledger already marks as successful
+and retries the rest, so an interrupted batch picks up where it left off.
+
+Manifest fields:
+    id          Unique row id (default: row number) - used for resume and file names
+    type        "image" or "video" (default: image)
+    prompt      Text prompt (required)
+    Any other field is passed to generate_image() / generate_video(), e.g.
+    model, negative_prompt, width, height, steps, cfg_scale, seed, frames,
+    num_images, init_image_path
+    Video rows can set model to "auto" to let the scheduler pick the fastest
+    suitable model, optionally with a deadline in seconds.
+
+Usage:
+    export TEXEL_API_KEY="your_api_key_here"
+    python texel_batch.py jobs.jsonl --output-dir outputs --concurrency 4
+    python texel_batch.py jobs.csv --output-dir outputs  # rerun to resume
+    python texel_batch.py jobs.jsonl --postprocess  # thumbnails, posters and sidecars
+"""
+
+import argparse
+import contextlib
+import contextvars
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any
+
+from texel_api import VIDEO_MODELS, CircuitBreaker, StatsCollector, TexelAPI, TexelAPIError, Tracer
+from texel_postprocess import MediaPostProcessor
+from texel_scheduler import VideoScheduler
+
+# CSV values arrive as strings; these fields are converted before calling the SDK
+INT_FIELDS = {"width", "height", "steps", "seed", "frames", "num_images"}
+FLOAT_FIELDS = {"cfg_scale", "deadline"}
+
+
+def _coerce(row: dict[str, Any]) -> dict[str, Any]:
+    """Drop empty CSV cells and convert numeric fields"""
+    job = {}
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            if key in INT_FIELDS:
+                value = int(value)
+            elif key in FLOAT_FIELDS:
+                value = float(value)
+        job[key] = value
+    return job
+
+
+def load_manifest(path: Path) -> list[dict[str, Any]]:
+    """Read jobs from a .jsonl or .csv manifest, assigning ids to rows without one"""
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [_coerce(row) for row in csv.DictReader(f)]
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        job = dict(row)
+        job["id"] = str(job.get("id") or f"row{number}")
+        job["type"] = job.get("type", "image").lower()
+        if job["id"] in seen:
+            raise ValueError(f"Duplicate job id in manifest: {job['id']}")
+        if job["type"] not in ("image", "video"):
+            raise ValueError(f"Job {job['id']}: unknown type {job['type']!r} (expected image or video)")
+        if not job.get("prompt"):
+            raise ValueError(f"Job {job['id']}: prompt is required")
+        seen.add(job["id"])
+        jobs.append(job)
+    return jobs
+
+
+def load_completed(ledger_path: Path) -> set[str]:
+    """Ids of jobs the ledger records as successful"""
+    completed = set()
+    if not ledger_path.exists():
+        return completed
+    with open(ledger_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if entry.get("status") == "success":
+                completed.add(entry["id"])
+    return completed
+
+
+class BatchRunner:
+    """Runs manifest jobs concurrently and records each outcome in the ledger"""
+
+    def __init__(
+        self,
+        api_key: str,
+        output_dir: Path,
+        ledger_path: Path,
+        concurrency: int = 4,
+        video_timeout: int = 600,
+        poll_interval: int = 10,
+        stats: StatsCollector = None,
+        circuit_breaker: CircuitBreaker = None,
+        tracer: Tracer = None,
+        scheduler: VideoScheduler = None,
+        postprocessor: MediaPostProcessor = None,
+    ):
+        self.api_key = api_key
+        self.output_dir = output_dir
+        self.ledger_path = ledger_path
+        self.concurrency = concurrency
+        self.video_timeout = video_timeout
+        self.poll_interval = poll_interval
+        self.stats = stats
+        # Shared by every worker's client so an API outage stops the whole batch from hammering it
+        self.circuit_breaker = circuit_breaker
+        self.tracer = tracer
+        # Routes video jobs, caps per-model concurrency and learns Texel timings
+        self.scheduler = scheduler or VideoScheduler()
+        # Post-processes downloads in other processes while workers move on to the next job
+        self.postprocessor = postprocessor
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at = time.time()
+
+    def _client(self) -> TexelAPI:
+        # requests.Session isn't guaranteed thread-safe, so each worker gets its own client
+        if not hasattr(self._local, "client"):
+            self._local.client = TexelAPI(
+                self.api_key,
+                hooks=[self.stats] if self.stats else None,
+                circuit_breaker=self.circuit_breaker,
+                tracer=self.tracer,
+            )
+        return self._local.client
+
+    def _run_image(self, job: dict[str, Any]) -> dict[str, Any]:
+        client = self._client()
+        params = {k: v for k, v in job.items() if k not in ("id", "type", "prompt")}
+        result = client.generate_image(job["prompt"], **params)
+        if not result["images"]:
+            raise TexelAPIError("No images returned")
+
+        saved = []
+        for i, image in enumerate(result["images"]):
+            suffix = f"_{i + 1}" if len(result["images"]) > 1 else ""
+            path = self.output_dir / f"{job['id']}{suffix}.jpg"
+            saved.append(client.download_image(image, str(path)))
+        return {
+            "outputs": [s["path"] for s in saved],
+            "sha256": [s["sha256"] for s in saved],
+            "job_id": result.get("job_id"),
+            "seed": result.get("seed"),
+            **self._postprocess(job, saved, "image", model=result.get("model_used"), seed=result.get("seed")),
+        }
+
+    def _run_video(self, job: dict[str, Any]) -> dict[str, Any]:
+        client = self._client()
+        params = {k: v for k, v in job.items() if k not in ("id", "type", "prompt", "model", "deadline")}
+        model = job.get("model", "framepack")
+        result = self.scheduler.submit(
+            client,
+            job["prompt"],
+            deadline=job.get("deadline"),
+            models=None if model == "auto" else [model],
+            **params,
+        )
+        try:
+            final = client.wait_for_video(
+                result["job_id"], result["model_type"], timeout=self.video_timeout, poll_interval=self.poll_interval
+            )
+        finally:
+            self.scheduler.release(result["job_id"])
+        if not final["completed"]:
+            raise TexelAPIError(final["error_message"] or f"Video job ended with status {final['status']}")
+
+        path = self.output_dir / f"{job['id']}.mp4"
+        saved = client.download_video(final["video_urls"][0], str(path))
+        return {
+            "outputs": [saved["path"]],
+            "sha256": [saved["sha256"]],
+            "job_id": result.get("job_id"),
+            "seed": result.get("seed"),
+            "model": result["model_used"],
+            "estimated_s": result["estimate"]["total_s"],
+            **self._postprocess(job, [saved], "video", model=result["model_used"], seed=result.get("seed")),
+        }
+
+    def _postprocess(self, job: dict[str, Any], saved: list, kind: str, **metadata) -> dict[str, Any]:
+        """Queue the job's files for post-processing; run() waits for them before recording the job"""
+        if not self.postprocessor:
+            return {}
+        metadata = {"id": job["id"], "prompt": job["prompt"], **metadata}
+        futures = []
+        errors = []
+        for s in saved:
+            try:
+                futures.append(self.postprocessor.submit(s["path"], kind, s["sha256"], metadata))
+            except Exception as e:
+                # e.g. BrokenProcessPool; the media was saved fine, so the job still counts as a success
+                errors.append(str(e))
+        result = {"_postprocess": futures}
+        if errors:
+            result["postprocess_errors"] = errors
+        return result
+
+    def _span(self, name: str, **attributes):
+        return self.tracer.span(name, **attributes) if self.tracer else contextlib.nullcontext()
+
+    def run_job(self, job: dict[str, Any]) -> dict[str, Any]:
+        """Run one job and return its ledger entry (never raises)"""
+        started = time.time()
+        entry = {"id": job["id"], "type": job["type"]}
+        with self._span("texel.batch_job", job_id=job["id"], job_type=job["type"]) as span:
+            try:
+                run = self._run_video if job["type"] == "video" else self._run_image
+                entry.update(status="success", **run(job))
+            except Exception as e:
+                # Anything a job raises is recorded so a resume retries just this job
+                entry.update(status="failed", error=getattr(e, "message", str(e)))
+                if span is not None:
+                    span["status"] = "error"
+        entry["elapsed_s"] = round(time.time() - started, 2)
+        entry["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        return entry
+
+    def _record(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            with open(self.ledger_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            if entry["status"] == "success":
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self._print_progress()
+            if entry["status"] != "success":
+                print(f"\n❌ {entry['id']}: {entry['error']}", file=sys.stderr)
+
+    def _print_progress(self) -> None:
+        done = self.succeeded + self.failed
+        elapsed = time.time() - self.started_at
+        rate = done / elapsed * 60 if elapsed else 0.0
+        print(
+            f"\r⏳ {done}/{self.total} done - ✅ {self.succeeded} ❌ {self.failed} - {rate:.1f} jobs/min",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    def run(self, jobs: list[dict[str, Any]]) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        self.total = len(jobs)
+        self.started_at = time.time()
+        self._print_progress()
+
+        with self._span("texel.batch", jobs=len(jobs), concurrency=self.concurrency):
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                # Each job runs in a copy of this context so its spans nest under the batch span
+                pending = {pool.submit(contextvars.copy_context().run, self.run_job, job) for job in jobs}
+                # Post-processing future -> ledger entry it belongs to
+                postprocessing = {}
+                error = None
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in postprocessing:
+                            entry = postprocessing.pop(future)
+                            self._postprocessed(entry, future)
+                            if not any(owner is entry for owner in postprocessing.values()):
+                                self._record(entry)
+                            continue
+                        try:
+                            entry = future.result()
+                        except Exception as e:
+                            # Keep recording the other jobs so a resume doesn't pay for them again
+                            error = error or e
+                            continue
+                        futures = entry.pop("_postprocess", None)
+                        if futures:
+                            postprocessing.update(dict.fromkeys(futures, entry))
+                            pending.update(futures)
+                        else:
+                            self._record(entry)
+                if error is not None:
+                    raise error
+        print(file=sys.stderr)
+
+    @staticmethod
+    def _postprocessed(entry: dict[str, Any], future) -> None:
+        """Add one file's post-processing outcome to its job's ledger entry"""
+        try:
+            sidecar = future.result()
+        except Exception as e:
+            # The media was saved fine, so the job still counts as a success
+            entry.setdefault("postprocess_errors", []).append(str(e))
+            return
+        entry.setdefault("sidecars", []).append(sidecar["sidecar"])
+        if sidecar["errors"]:
+            entry.setdefault("postprocess_errors", []).extend(sidecar["errors"])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate Texel images and videos from a JSONL/CSV manifest")
+    parser.add_argument("manifest", type=Path, help="Path to a .jsonl or .csv manifest")
+    parser.add_argument("--output-dir", type=Path, default=Path("outputs"), help="Where to save generated files")
+    parser.add_argument("--ledger", type=Path, help="Results ledger (default: <output-dir>/results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs to run at the same time")
+    parser.add_argument("--video-timeout", type=int, default=600, help="Seconds to wait for each video")
+    parser.add_argument("--poll-interval", type=int, default=10, help="Seconds between video status checks")
+    parser.add_argument("--stats", action="store_true", help="Print API latency and throughput stats at the end")
+    parser.add_argument(
+        "--circuit-breaker",
+        action="store_true",
+        help="Fail remaining jobs fast while the API keeps erroring (rerun later to retry them)",
+    )
+    parser.add_argument("--max-per-model", type=int, help="Cap on video jobs running at once on each model")
+    parser.add_argument(
+        "--timings",
+        type=Path,
+        help="Observed video timings used for routing (default: <output-dir>/video_timings.json)",
+    )
+    parser.add_argument(
+        "--postprocess",
+        action="store_true",
+        help="Write thumbnails, video poster frames and a metadata sidecar for every output (uses ffmpeg/Pillow)",
+    )
+    parser.add_argument("--postprocess-workers", type=int, help="Post-processing worker processes (default: CPUs)")
+    parser.add_argument("--trace", type=Path, help="Append trace spans for every job and API call to this JSONL file")
+    parser.add_argument("--api-key", default=os.getenv("TEXEL_API_KEY"), help="Texel API key (default: $TEXEL_API_KEY)")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        print("❌ API key is required! Set TEXEL_API_KEY or pass --api-key", file=sys.stderr)
+        return 2
+
+    ledger_path = args.ledger or args.output_dir / "results.jsonl"
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read manifest: {e}", file=sys.stderr)
+        return 2
+
+    completed = load_completed(ledger_path)
+    pending = [job for job in jobs if job["id"] not in completed]
+
+    print(f"🚀 {len(jobs)} jobs in manifest, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+    if not pending:
+        return 0
+
+    postprocessor = MediaPostProcessor(args.postprocess_workers) if args.postprocess else None
+    runner = BatchRunner(
+        args.api_key,
+        args.output_dir,
+        ledger_path,
+        concurrency=args.concurrency,
+        video_timeout=args.video_timeout,
+        poll_interval=args.poll_interval,
+        stats=StatsCollector() if args.stats else None,
+        circuit_breaker=CircuitBreaker() if args.circuit_breaker else None,
+        tracer=Tracer(str(args.trace)) if args.trace else None,
+        scheduler=VideoScheduler(
+            max_concurrency=dict.fromkeys(VIDEO_MODELS, args.max_per_model) if args.max_per_model else None,
+            history_path=str(args.timings or args.output_dir / "video_timings.json"),
+        ),
+        postprocessor=postprocessor,
+    )
+    try:
+        runner.run(pending)
+    finally:
+        if postprocessor:
+            postprocessor.close()
+    print(f"🎉 Finished: ✅ {runner.succeeded} succeeded, ❌ {runner.failed} failed. Ledger: {ledger_path}")
+    if runner.stats:
+        print(runner.stats.summary())
+    return 1 if runner.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Texel AI SDK Circuit Breaker
+
+Makes a TexelAPI client fail fast with TexelCircuitOpenError while the API
+keeps failing, instead of every request waiting on errors and timeouts.
+
+Usage:
+    from texel_api import TexelAPI
+    from texel_circuit import CircuitBreaker
+
+    client = TexelAPI(api_key, circuit_breaker=CircuitBreaker(slow_call_seconds=60))
+
+CircuitBreaker is also importable from texel_api.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """
+    Client-side circuit breaker for the Texel API
+
+    Tracks the outcome of recent requests. Once at least min_calls requests in the
+    last window_seconds have a failure rate of failure_rate or more, the circuit
+    opens and requests fail fast with TexelCircuitOpenError for open_seconds.
+    After that a single trial request is let through; if it succeeds the circuit
+    closes again. Connection errors, 429 and 5xx responses and requests slower
+    than slow_call_seconds count as failures. Thread-safe, so one breaker can be
+    shared by several clients.
+
+    Example:
+        breaker = CircuitBreaker()
+        client = TexelAPI(api_key, circuit_breaker=breaker)
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 60.0,
+        open_seconds: float = 30.0,
+        slow_call_seconds: float = None,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.state = "closed"
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit lets a trial request through"""
+        with self._lock:
+            return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def release(self) -> None:
+        """Give back a request allowed through without recording an outcome (e.g. a 4xx rejection)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, failed: bool, elapsed: float = 0.0) -> None:
+        """Record the outcome of a request that was allowed through"""
+        if self.slow_call_seconds is not None and elapsed > self.slow_call_seconds:
+            failed = True
+        with self._lock:
+            self._trial_in_flight = False
+            now = time.monotonic()
+            if self.state == "half_open":
+                if failed:
+                    self.state, self._opened_at = "open", now
+                else:
+                    self.state = "closed"
+                    self._calls.clear()
+                return
+
+            self._calls.append((now, failed))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            failures = sum(1 for _, f in self._calls if f)
+            if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_rate:
+                self.state, self._opened_at = "open", now
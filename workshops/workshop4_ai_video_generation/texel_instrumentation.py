@@ -0,0 +1,189 @@
+"""
+Texel AI SDK Instrumentation
+
+Hooks that receive request, download, poll and job state events from a
+TexelAPI client, and StatsCollector, an in-memory collector built on them.
+
+Usage:
+    from texel_api import TexelAPI
+    from texel_instrumentation import StatsCollector
+
+    stats = StatsCollector()
+    client = TexelAPI(api_key, hooks=[stats])
+    ...
+    print(stats.summary())
+
+Both classes are also importable from texel_api.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of values (0.0 when there are none)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class TexelHooks:
+    """
+    Base class for instrumentation hooks
+
+    Subclass it and override the events you care about, then pass instances to
+    TexelAPI(hooks=[...]) or client.add_hook(). Exceptions raised by a hook are
+    ignored so instrumentation can never break a generation.
+    """
+
+    def on_request_start(self, method: str, endpoint: str, bytes_sent: int) -> None:
+        """Called before an API request is sent"""
+
+    def on_request_end(
+        self,
+        method: str,
+        endpoint: str,
+        status_code: int,
+        elapsed: float,
+        bytes_sent: int,
+        bytes_received: int,
+        error: str = None,
+    ) -> None:
+        """Called after an API request finishes (status_code is None if no response arrived)"""
+
+    def on_download(self, kind: str, bytes_received: int, elapsed: float, error: str = None) -> None:
+        """Called after a video download or image save finishes"""
+
+    def on_poll(self, job_id: str, status: str, progress: float) -> None:
+        """Called for every video status check"""
+
+    def on_job_state(self, job_id: str, model_type: str, old_status: str, new_status: str) -> None:
+        """Called when a video job changes status (old_status is None for a new job)"""
+
+
+class StatsCollector(TexelHooks):
+    """
+    In-memory stats collector
+
+    Records per-endpoint latency, status codes and bytes transferred, plus download
+    throughput, poll counts and job state timings. Thread-safe, so one collector
+    can be shared by several clients.
+
+    Example:
+        stats = StatsCollector()
+        client = TexelAPI(api_key, hooks=[stats])
+        ...
+        print(stats.summary())
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self.started_at = time.time()
+        self.latencies = defaultdict(lambda: deque(maxlen=self._max_samples))
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+        self.bytes_sent = defaultdict(int)
+        self.bytes_received = defaultdict(int)
+        self.downloads = defaultdict(lambda: {"count": 0, "errors": 0, "bytes": 0, "seconds": 0.0})
+        self.polls = 0
+        self.transitions = defaultdict(int)
+        self._job_state_since = {}
+        self.state_durations = defaultdict(lambda: deque(maxlen=self._max_samples))
+
+    def on_request_end(self, method, endpoint, status_code, elapsed, bytes_sent, bytes_received, error=None):
+        key = f"{method} {endpoint}"
+        with self._lock:
+            self.requests[key] += 1
+            self.latencies[key].append(elapsed)
+            self.status_codes[key][status_code] += 1
+            self.bytes_sent[key] += bytes_sent
+            self.bytes_received[key] += bytes_received
+            if error:
+                self.errors[key] += 1
+
+    def on_download(self, kind, bytes_received, elapsed, error=None):
+        with self._lock:
+            stats = self.downloads[kind]
+            stats["count"] += 1
+            stats["bytes"] += bytes_received
+            stats["seconds"] += elapsed
+            if error:
+                stats["errors"] += 1
+
+    def on_poll(self, job_id, status, progress):
+        with self._lock:
+            self.polls += 1
+
+    def on_job_state(self, job_id, model_type, old_status, new_status):
+        now = time.time()
+        with self._lock:
+            self.transitions[f"{old_status} -> {new_status}"] += 1
+            if old_status is not None and job_id in self._job_state_since:
+                # Time spent in the previous state, e.g. how long jobs sit queued on Texel's side
+                self.state_durations[old_status].append(now - self._job_state_since[job_id])
+            if new_status in ("success", "failed", "error"):
+                self._job_state_since.pop(job_id, None)
+            else:
+                self._job_state_since[job_id] = now
+
+    def report(self) -> dict[str, Any]:
+        """Return a snapshot of all collected stats"""
+        with self._lock:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            endpoints = {}
+            for key, samples in self.latencies.items():
+                endpoints[key] = {
+                    "requests": self.requests[key],
+                    "errors": self.errors[key],
+                    "status_codes": dict(self.status_codes[key]),
+                    "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                    "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                    "p99_ms": round(percentile(samples, 99) * 1000, 1),
+                    "requests_per_s": round(self.requests[key] / elapsed, 3),
+                    "bytes_sent": self.bytes_sent[key],
+                    "bytes_received": self.bytes_received[key],
+                }
+            downloads = {}
+            for kind, stats in self.downloads.items():
+                mb_per_s = stats["bytes"] / 1e6 / stats["seconds"] if stats["seconds"] else 0.0
+                downloads[kind] = {**stats, "mb_per_s": round(mb_per_s, 2)}
+            state_durations = {
+                state: {
+                    "p50_s": round(percentile(samples, 50), 1),
+                    "p95_s": round(percentile(samples, 95), 1),
+                }
+                for state, samples in self.state_durations.items()
+            }
+            return {
+                "elapsed_s": round(elapsed, 1),
+                "endpoints": endpoints,
+                "downloads": downloads,
+                "polls": self.polls,
+                "job_transitions": dict(self.transitions),
+                "time_in_state": state_durations,
+            }
+
+    def summary(self) -> str:
+        """Return a human-readable summary of the collected stats"""
+        report = self.report()
+        lines = [f"📊 Texel API stats over {report['elapsed_s']}s"]
+        for key, stats in report["endpoints"].items():
+            lines.append(
+                f"   {key}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"p50 {stats['p50_ms']}ms / p95 {stats['p95_ms']}ms / p99 {stats['p99_ms']}ms, "
+                f"{stats['bytes_sent'] / 1e6:.1f} MB up / {stats['bytes_received'] / 1e6:.1f} MB down"
+            )
+        for kind, stats in report["downloads"].items():
+            lines.append(
+                f"   {kind} downloads: {stats['count']} ({stats['bytes'] / 1e6:.1f} MB at {stats['mb_per_s']} MB/s)"
+            )
+        if report["polls"]:
+            lines.append(f"   Status polls: {report['polls']}")
+        for state, stats in report["time_in_state"].items():
+            lines.append(f"   Time in '{state}': p50 {stats['p50_s']}s / p95 {stats['p95_s']}s")
+        return "\n".join(lines)
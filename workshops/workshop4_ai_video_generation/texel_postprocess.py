@@ -0,0 +1,263 @@
+"""
+Texel AI Media Post-Processing
+
+Produces checksums, poster frames, thumbnails and a metadata sidecar for
+downloaded images and videos in a pool of worker processes, so post-processing
+overlaps with generation and downloads instead of running as a serial pass
+afterwards. Pass the SHA-256 returned by download_video()/download_image()
+(hashed while the file was written) and the file isn't read again just to hash it.
+
+Usage:
+    from texel_api import TexelAPI
+    from texel_postprocess import MediaPostProcessor
+
+    client = TexelAPI(api_key)
+    with MediaPostProcessor(max_workers=4) as post:
+        saved = client.download_video(status["video_urls"][0], "cat.mp4")
+        future = post.submit(saved["path"], sha256=saved["sha256"], metadata={"prompt": "A cat"})
+        # ... keep generating and downloading ...
+        sidecar = future.result()  # also written to cat.mp4.json
+
+Video posters and thumbnails and video metadata need ffmpeg/ffprobe on the
+PATH. Image thumbnails use Pillow when installed (pip install Pillow), falling
+back to ffmpeg. Without either, sidecars still carry size and checksum and
+list what was skipped.
+
+Workers import the calling script afresh (they are not forked), so scripts
+should create the processor under `if __name__ == "__main__":`.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+try:
+    # Optional: image dimensions and thumbnails without ffmpeg
+    from PIL import Image
+except ImportError:
+    Image = None
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".mkv")
+DEFAULT_THUMBNAIL_SIZES = (320,)
+
+# Poster frames are taken this many seconds in, or halfway through shorter videos
+DEFAULT_POSTER_AT = 1.0
+
+FFMPEG_TIMEOUT = 120
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _run(command: list) -> subprocess.CompletedProcess:
+    return subprocess.run(command, capture_output=True, text=True, timeout=FFMPEG_TIMEOUT, check=True)
+
+
+def _probe_video(ffprobe: str, path: Path) -> dict[str, Any]:
+    """Duration, size, frame rate and codec of the first video stream"""
+    entries = "stream=width,height,codec_name,avg_frame_rate,nb_frames:format=duration"
+    command = [ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries", entries, "-of", "json", str(path)]
+    data = json.loads(_run(command).stdout or "{}")
+    stream = (data.get("streams") or [{}])[0]
+    info = {
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "codec": stream.get("codec_name"),
+    }
+    duration = data.get("format", {}).get("duration")
+    info["duration_s"] = round(float(duration), 3) if duration else None
+    numerator, _, denominator = (stream.get("avg_frame_rate") or "0/0").partition("/")
+    if denominator and float(denominator):
+        info["fps"] = round(float(numerator) / float(denominator), 3)
+    if stream.get("nb_frames"):
+        info["frames"] = int(stream["nb_frames"])
+    return info
+
+
+def _thumbnail_path(path: Path, size: int) -> Path:
+    return path.with_name(f"{path.stem}.thumb{size}.jpg")
+
+
+def _ffmpeg_thumbnails(ffmpeg: str, source: Path, path: Path, sizes) -> list[str]:
+    thumbnails = []
+    for size in sizes:
+        target = _thumbnail_path(path, size)
+        _run([ffmpeg, "-v", "error", "-y", "-i", str(source), "-vf", f"scale={size}:-2", "-q:v", "3", str(target)])
+        thumbnails.append(str(target))
+    return thumbnails
+
+
+def _process_video(path: Path, sidecar: dict, sizes, poster_at: float, ffmpeg: str, ffprobe: str) -> None:
+    if not ffprobe or not ffmpeg:
+        sidecar["skipped"].append("poster and thumbnails (ffmpeg/ffprobe not found)")
+        return
+
+    sidecar.update(_probe_video(ffprobe, path))
+    duration = sidecar.get("duration_s")
+    at = min(poster_at, duration / 2) if duration else 0.0
+    poster = path.with_name(f"{path.stem}.poster.jpg")
+    _run([ffmpeg, "-v", "error", "-y", "-ss", f"{at:.3f}", "-i", str(path), "-frames:v", "1", "-q:v", "2", str(poster)])
+    sidecar["poster"] = str(poster)
+    sidecar["poster_at_s"] = round(at, 3)
+    sidecar["thumbnails"] = _ffmpeg_thumbnails(ffmpeg, poster, path, sizes)
+
+
+def _process_image(path: Path, sidecar: dict, sizes, ffmpeg: str) -> None:
+    if Image is not None:
+        with Image.open(path) as image:
+            sidecar["width"], sidecar["height"] = image.size
+            thumbnails = []
+            for size in sizes:
+                thumbnail = image.convert("RGB")
+                # Bounded by width only; keeps the aspect ratio and never upscales
+                thumbnail.thumbnail((size, image.height))
+                target = _thumbnail_path(path, size)
+                thumbnail.save(target, "JPEG", quality=85)
+                thumbnails.append(str(target))
+            sidecar["thumbnails"] = thumbnails
+    elif ffmpeg:
+        sidecar["thumbnails"] = _ffmpeg_thumbnails(ffmpeg, path, path, sizes)
+    else:
+        sidecar["skipped"].append("thumbnails (Pillow and ffmpeg not found)")
+
+
+def postprocess_file(
+    path: str,
+    kind: str = None,
+    sha256: str = None,
+    metadata: dict = None,
+    thumbnail_sizes=DEFAULT_THUMBNAIL_SIZES,
+    poster_at: float = DEFAULT_POSTER_AT,
+    ffmpeg: str = None,
+    ffprobe: str = None,
+) -> dict[str, Any]:
+    """
+    Checksum, poster frame, thumbnails and metadata sidecar for one file
+
+    Runs in a worker process (it is a plain function so it can be pickled), but
+    can be called directly too. Failures of individual steps are recorded in the
+    sidecar's "errors" instead of raised, since the media itself is fine.
+
+    Args:
+        path: Image or video file
+        kind: "image" or "video" (default: from the file extension)
+        sha256: Checksum computed during the download (default: hash the file)
+        metadata: Extra fields stored in the sidecar, e.g. prompt, model, seed, job_id
+        thumbnail_sizes: Thumbnail widths in pixels
+        poster_at: Seconds into a video to take the poster frame from
+        ffmpeg: Path to ffmpeg (default: found on the PATH)
+        ffprobe: Path to ffprobe (default: found on the PATH)
+
+    Returns:
+        The sidecar contents, also written to <path>.json
+    """
+    started = time.perf_counter()
+    media = Path(path)
+    kind = kind or ("video" if media.suffix.lower() in VIDEO_EXTENSIONS else "image")
+    ffmpeg = ffmpeg or shutil.which("ffmpeg")
+    ffprobe = ffprobe or shutil.which("ffprobe")
+
+    sidecar = {
+        "file": media.name,
+        "kind": kind,
+        "bytes": media.stat().st_size,
+        "sha256": sha256 or _sha256_file(media),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(media.stat().st_mtime)),
+        **(metadata or {}),
+        "skipped": [],
+        "errors": [],
+    }
+    try:
+        if kind == "video":
+            _process_video(media, sidecar, thumbnail_sizes, poster_at, ffmpeg, ffprobe)
+        else:
+            _process_image(media, sidecar, thumbnail_sizes, ffmpeg)
+    except subprocess.CalledProcessError as e:
+        sidecar["errors"].append(f"{Path(e.cmd[0]).name} failed: {(e.stderr or '').strip()[:500]}")
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        sidecar["errors"].append(str(e))
+
+    sidecar["postprocess_s"] = round(time.perf_counter() - started, 3)
+    sidecar_path = media.with_name(media.name + ".json")
+    sidecar_path.write_text(json.dumps(sidecar, indent=2), encoding="utf-8")
+    sidecar["sidecar"] = str(sidecar_path)
+    return sidecar
+
+
+class MediaPostProcessor:
+    """
+    Runs postprocess_file() for downloaded media in a process pool
+
+    submit() returns immediately with a Future, so callers keep downloading
+    while earlier files are processed. Use it as a context manager, or call
+    close(), to wait for outstanding work.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        thumbnail_sizes=DEFAULT_THUMBNAIL_SIZES,
+        poster_at: float = DEFAULT_POSTER_AT,
+    ):
+        """
+        Args:
+            max_workers: Worker processes (default: CPU count)
+            thumbnail_sizes: Thumbnail widths in pixels
+            poster_at: Seconds into each video to take the poster frame from
+        """
+        self.thumbnail_sizes = tuple(thumbnail_sizes)
+        self.poster_at = poster_at
+        # Resolved once here rather than in every worker
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.ffprobe = shutil.which("ffprobe")
+        # Forking copies whatever locks the caller's threads (downloads, polling) hold at that
+        # moment; workers started by a forkserver or spawned from scratch don't inherit them
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=context)
+
+    def submit(self, path: str, kind: str = None, sha256: str = None, metadata: dict = None) -> Future:
+        """
+        Queue one file for post-processing
+
+        Args:
+            path: Image or video file
+            kind: "image" or "video" (default: from the file extension)
+            sha256: Checksum from download_video()/download_image(), so the file isn't re-read to hash it
+            metadata: Extra fields stored in the sidecar
+
+        Returns:
+            Future resolving to the sidecar contents
+        """
+        return self._pool.submit(
+            postprocess_file,
+            str(path),
+            kind,
+            sha256,
+            metadata,
+            self.thumbnail_sizes,
+            self.poster_at,
+            self.ffmpeg,
+            self.ffprobe,
+        )
+
+    def close(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,339 @@
+"""
+Texel AI Video Scheduler
+
+Picks the video model for a job from observed Texel timings instead of a
+hardcoded choice. The scheduler learns how long jobs sit in Texel's queue and
+how long they take to render, per model and per resolution/frame count, and
+uses that to estimate when a new job would finish on each model. It then routes
+the job to the fastest model that supports it (text-to-video or image-to-video)
+and meets the caller's deadline, while capping how many jobs run per model.
+
+Usage:
+    from texel_api import TexelAPI
+    from texel_scheduler import VideoScheduler
+
+    client = TexelAPI(api_key)
+    scheduler = VideoScheduler(max_concurrency={"wan": 2}, history_path="video_timings.json")
+
+    job = scheduler.submit(client, "A cat dancing in the rain", deadline=300)
+    print(job["model_used"], job["estimate"]["total_s"])
+    status = client.wait_for_video(job["job_id"], job["model_type"])
+    scheduler.release(job["job_id"])
+
+    # Compare models without submitting anything
+    for estimate in scheduler.plan("t2v", deadline=300):
+        print(estimate["model"], estimate["total_s"], estimate["meets_deadline"])
+
+Timings are only as precise as the status polling that observes them.
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any
+
+from texel_api import VIDEO_MODELS, TexelAPIError, video_settings
+from texel_instrumentation import TexelHooks, percentile
+
+# Rough starting points (seconds at each model's default settings) used until
+# real timings have been observed. Observations replace them quickly.
+DEFAULT_RENDER_SECONDS = {"framepack": 90.0, "ltxv": 60.0, "wan": 300.0, "hunyuan": 420.0}
+DEFAULT_QUEUE_SECONDS = 15.0
+
+# Statuses that mean a job hasn't started rendering yet
+QUEUED_STATUSES = ("submitted", "queued", "pending", "waiting")
+TERMINAL_STATUSES = ("success", "failed", "error")
+
+# Samples needed at an exact model/resolution/frames before they're used directly
+MIN_EXACT_SAMPLES = 3
+
+
+def _work(width: int, height: int, frames: int) -> float:
+    """Megapixel-frames, the unit render time is assumed to scale with"""
+    return width * height * (frames or 1) / 1e6
+
+
+class VideoScheduler(TexelHooks):
+    """
+    Deadline-aware video model router with per-model concurrency caps
+
+    Register it as a hook on the clients that poll its jobs (submit() does this)
+    so it sees job status changes. Thread-safe, so one scheduler can route jobs
+    for several clients and threads.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: dict = None,
+        history_path: str = None,
+        percentile: float = 75,
+        max_samples: int = 200,
+    ):
+        """
+        Args:
+            max_concurrency: Jobs allowed in flight per model, e.g. {"wan": 2} (models not listed are unlimited)
+            history_path: Optional JSON file that observed timings are loaded from and saved to
+            percentile: Percentile of observed timings used for estimates (higher is more conservative)
+            max_samples: Timings kept per model
+        """
+        self.max_concurrency = dict(max_concurrency or {})
+        self.history_path = Path(history_path) if history_path else None
+        self.percentile = percentile
+        self._condition = threading.Condition()
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._jobs = {}
+        self._active = defaultdict(int)
+
+        if self.history_path and self.history_path.exists():
+            try:
+                with open(self.history_path, encoding="utf-8") as f:
+                    history = json.load(f)
+                for sample in history:
+                    self._samples[sample["model"]].append(sample)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                # A damaged history only costs the learned timings; start fresh rather than fail
+                print(f"⚠️ Ignoring unreadable timing history {self.history_path}: {e}", file=sys.stderr)
+                self._samples.clear()
+
+    # Learning
+
+    def record(self, model: str, width: int, height: int, frames: int, queue_s: float, render_s: float) -> None:
+        """Add an observed job timing (queue_s may be None if the queued phase wasn't seen)"""
+        sample = {
+            "model": model,
+            "width": width,
+            "height": height,
+            "frames": frames,
+            "queue_s": None if queue_s is None else round(queue_s, 2),
+            "render_s": round(render_s, 2),
+            "at": time.time(),
+        }
+        with self._condition:
+            self._samples[model].append(sample)
+            if self.history_path:
+                self._save_history()
+
+    def _save_history(self) -> None:
+        """Write the timings to a temporary file and swap it in, so readers never see a partial file"""
+        history = [s for samples in self._samples.values() for s in samples]
+        fd, temp_path = tempfile.mkstemp(dir=self.history_path.parent, prefix=f".{self.history_path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(history, f)
+            os.replace(temp_path, self.history_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def on_job_state(self, job_id, model_type, old_status, new_status):
+        now = time.time()
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if job["started_at"] is None and new_status not in QUEUED_STATUSES + TERMINAL_STATUSES:
+                job["started_at"] = now
+        if new_status == "success":
+            if job["started_at"] is not None:
+                queue_s, render_s = job["started_at"] - job["submitted_at"], now - job["started_at"]
+            else:
+                # Finished between two polls that both saw it queued: only the total is known
+                queue_s, render_s = None, now - job["submitted_at"]
+            self.record(job["model"], job["width"], job["height"], job["frames"], queue_s, render_s)
+        if new_status in TERMINAL_STATUSES:
+            self.release(job_id)
+
+    # Estimation
+
+    def estimate(self, model: str, width: int = None, height: int = None, frames: int = None) -> dict[str, Any]:
+        """Estimated queue, render and local wait time for one job on one model"""
+        if model not in VIDEO_MODELS:
+            raise TexelAPIError(f"Unknown video model: {model}. Available models: {list(VIDEO_MODELS.keys())}")
+        width, height, frames = video_settings(model, width, height, frames)
+        work = _work(width, height, frames)
+
+        with self._condition:
+            samples = list(self._samples[model])
+            active = self._active[model]
+        exact = [s for s in samples if (s["width"], s["height"], s["frames"]) == (width, height, frames)]
+
+        if len(exact) >= MIN_EXACT_SAMPLES:
+            render_s = percentile([s["render_s"] for s in exact], self.percentile)
+            basis = f"{len(exact)} samples at this size"
+        elif samples:
+            # Scale the model's observed seconds per megapixel-frame to this size
+            rates = [s["render_s"] / _work(s["width"], s["height"], s["frames"]) for s in samples]
+            render_s = percentile(rates, self.percentile) * work
+            basis = f"{len(samples)} samples scaled to this size"
+        else:
+            default_work = _work(*video_settings(model))
+            render_s = DEFAULT_RENDER_SECONDS.get(model, 300.0) * work / default_work
+            basis = "default guess"
+
+        queue_samples = [s["queue_s"] for s in samples if s["queue_s"] is not None]
+        queue_s = percentile(queue_samples, self.percentile) if queue_samples else DEFAULT_QUEUE_SECONDS
+
+        # Waiting for one of our own slots: each batch of `cap` running jobs frees up after about a render
+        cap = self.max_concurrency.get(model)
+        wait_s = 0.0
+        if cap and active >= cap:
+            wait_s = math.ceil((active - cap + 1) / cap) * render_s
+
+        return {
+            "model": model,
+            "width": width,
+            "height": height,
+            "frames": frames,
+            "queue_s": round(queue_s, 1),
+            "render_s": round(render_s, 1),
+            "wait_s": round(wait_s, 1),
+            "total_s": round(wait_s + queue_s + render_s, 1),
+            "basis": basis,
+        }
+
+    def plan(
+        self,
+        mode: str = "t2v",
+        deadline: float = None,
+        models: list = None,
+        width: int = None,
+        height: int = None,
+        frames: int = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Estimates for every candidate model, fastest first
+
+        Args:
+            mode: "t2v" (text to video) or "i2v" (image to video)
+            deadline: Seconds from now the video should be ready in
+            models: Candidate models (default: every model that supports the mode)
+            width: Video width (default: each model's own default)
+            height: Video height (default: each model's own default)
+            frames: Frame count (default: each model's own default)
+        """
+        if models is None:
+            models = [name for name, config in VIDEO_MODELS.items() if mode in config["modes"]]
+        estimates = [self.estimate(model, width, height, frames) for model in models]
+        for estimate in estimates:
+            estimate["meets_deadline"] = deadline is None or estimate["total_s"] <= deadline
+        return sorted(estimates, key=lambda e: e["total_s"])
+
+    def choose(self, mode: str = "t2v", deadline: float = None, models: list = None, **settings) -> dict[str, Any]:
+        """Fastest candidate, or raise TexelAPIError if none is estimated to meet the deadline"""
+        estimates = self.plan(mode, deadline, models, **settings)
+        if not estimates:
+            raise TexelAPIError(f"No video model supports {mode}")
+        best = estimates[0]
+        if not best["meets_deadline"]:
+            raise TexelAPIError(
+                f"No model is expected to finish within {deadline:.0f}s "
+                f"(fastest: {best['model']} at about {best['total_s']:.0f}s)"
+            )
+        return best
+
+    # Submission
+
+    def submit(
+        self,
+        client,
+        prompt: str,
+        deadline: float = None,
+        models: list = None,
+        init_image_path: str = None,
+        width: int = None,
+        height: int = None,
+        frames: int = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """
+        Route a video job to the best model and submit it
+
+        Blocks while the chosen model is at its concurrency cap. Call release()
+        once you're done with the job if it may not reach a final status through
+        the client's polling (e.g. after a wait_for_video timeout).
+
+        Args:
+            client: TexelAPI client to submit with (the scheduler is added to its hooks)
+            prompt: Text description of the video to generate
+            deadline: Seconds from now the video should be ready in
+            models: Candidate models (default: every model that supports the job)
+            init_image_path: Path to an initial image for image-to-video generation
+            width: Video width (default: the chosen model's default)
+            height: Video height (default: the chosen model's default)
+            frames: Frame count (default: the chosen model's default)
+            **kwargs: Additional arguments passed to generate_video()
+
+        Returns:
+            The generate_video() result plus the "estimate" the model was chosen on
+        """
+        if self not in client.hooks:
+            client.add_hook(self)
+        mode = "i2v" if init_image_path else "t2v"
+        estimate = self.choose(mode, deadline, models, width=width, height=height, frames=frames)
+        model = estimate["model"]
+
+        with self._condition:
+            cap = self.max_concurrency.get(model)
+            while cap and self._active[model] >= cap:
+                self._condition.wait()
+            self._active[model] += 1
+
+        try:
+            result = client.generate_video(
+                prompt,
+                model=model,
+                width=estimate["width"],
+                height=estimate["height"],
+                frames=estimate["frames"],
+                init_image_path=init_image_path,
+                **kwargs,
+            )
+        except BaseException:
+            with self._condition:
+                self._active[model] -= 1
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            self._jobs[result["job_id"]] = {
+                "model": model,
+                "width": estimate["width"],
+                "height": estimate["height"],
+                "frames": estimate["frames"],
+                "submitted_at": time.time(),
+                "started_at": None,
+            }
+        result["estimate"] = estimate
+        return result
+
+    def release(self, job_id: str) -> None:
+        """Free the job's concurrency slot (safe to call more than once)"""
+        with self._condition:
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                self._active[job["model"]] -= 1
+                self._condition.notify_all()
+
+    def report(self) -> dict[str, Any]:
+        """Observed timings per model and jobs currently in flight"""
+        with self._condition:
+            report = {}
+            for model in VIDEO_MODELS:
+                samples = list(self._samples[model])
+                renders = [s["render_s"] for s in samples]
+                queues = [s["queue_s"] for s in samples if s["queue_s"] is not None]
+                report[model] = {
+                    "samples": len(samples),
+                    "active": self._active[model],
+                    "cap": self.max_concurrency.get(model),
+                    "render_p50_s": round(percentile(renders, 50), 1) if renders else None,
+                    "render_p90_s": round(percentile(renders, 90), 1) if renders else None,
+                    "queue_p50_s": round(percentile(queues, 50), 1) if queues else None,
+                }
+            return report
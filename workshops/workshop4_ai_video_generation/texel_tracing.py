@@ -0,0 +1,117 @@
+"""
+Texel AI SDK Tracing
+
+A minimal OpenTelemetry-style tracer. TexelAPI(tracer=...) records a span for
+every client call and sends a W3C traceparent header with API requests.
+
+Usage:
+    from texel_api import TexelAPI
+    from texel_tracing import Tracer
+
+    tracer = Tracer("spans.jsonl")
+    client = TexelAPI(api_key, tracer=tracer)
+
+Tracer is also importable from texel_api.
+"""
+
+import contextlib
+import contextvars
+import json
+import secrets
+import threading
+import time
+
+
+_current_span = contextvars.ContextVar("texel_current_span", default=None)
+
+
+class Tracer:
+    """
+    Minimal OpenTelemetry-style tracer
+
+    Every client call becomes a span (generate_video, each status poll and its HTTP
+    request, download_video, ...) nested under whatever span is active, so one
+    trace shows a job's whole path. API requests carry a W3C traceparent header.
+    Finished spans are written as JSON lines to export_path and/or passed to the
+    exporter callable as dicts. Thread-safe; run work in other threads through
+    contextvars.copy_context() to keep it in the same trace.
+
+    Example:
+        tracer = Tracer("spans.jsonl")
+        client = TexelAPI(api_key, tracer=tracer)
+        with tracer.span("make_clip"):
+            job = client.generate_video("A cat dancing in the rain")
+            client.wait_for_video(job["job_id"], job["model_type"])
+    """
+
+    def __init__(self, export_path: str = None, exporter=None, service_name: str = "texel-sdk"):
+        self.export_path = export_path
+        self.exporter = exporter
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, traceparent: str = None, **attributes):
+        """
+        Run a block inside a new span and yield the span dict
+
+        Args:
+            name: Span name
+            traceparent: Optional W3C traceparent to continue when no span is active
+            **attributes: Initial span attributes
+        """
+        parent = _current_span.get()
+        trace_id, parent_id = (parent["trace_id"], parent["span_id"]) if parent else (None, None)
+        if parent is None and traceparent:
+            parts = traceparent.split("-")
+            if len(parts) >= 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                trace_id, parent_id = parts[1], parts[2]
+
+        span = {
+            "service": self.service_name,
+            "trace_id": trace_id or secrets.token_hex(16),
+            "span_id": secrets.token_hex(8),
+            "parent_span_id": parent_id,
+            "name": name,
+            "start_time_unix_nano": time.time_ns(),
+            "status": "ok",
+            "attributes": dict(attributes),
+        }
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span["status"] = "error"
+            span["attributes"]["error.type"] = type(e).__name__
+            span["attributes"]["error.message"] = str(e)[:500]
+            raise
+        finally:
+            _current_span.reset(token)
+            span["end_time_unix_nano"] = time.time_ns()
+            span["duration_ms"] = round((span["end_time_unix_nano"] - span["start_time_unix_nano"]) / 1e6, 3)
+            self._export(span)
+
+    def _export(self, span: dict) -> None:
+        if self.exporter is not None:
+            try:
+                self.exporter(span)
+            except Exception:
+                pass
+        if self.export_path:
+            line = json.dumps(span, default=str) + "\n"
+            with self._lock:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+
+    @staticmethod
+    def traceparent() -> str:
+        """W3C traceparent header value for the active span (None outside a span)"""
+        span = _current_span.get()
+        return f"00-{span['trace_id']}-{span['span_id']}-01" if span else None
+
+    @staticmethod
+    def set_attributes(**attributes) -> None:
+        """Add attributes to the active span, if any"""
+        span = _current_span.get()
+        if span is not None:
+            span["attributes"].update(attributes)